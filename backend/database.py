@@ -1,23 +1,122 @@
 import json
+import logging
+import os
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-DB_PATH = Path(__file__).resolve().parent / "data" / "funds.db"
+from backend.services.http_client import EASTMONEY_HOST, XUEQIU_HOST, throttle
 
+logger = logging.getLogger(__name__)
 
-def _get_fund_info_by_akshare(fund_code: str) -> Optional[Dict]:
-    """使用 akshare 获取基金基本信息"""
+DB_PATH = Path(__file__).resolve().parent / "data" / "funds.db"
+# 数据库被锁时的等待时间（秒）与每个连接缓存的预编译语句数
+DB_BUSY_TIMEOUT = float(os.environ.get("DB_BUSY_TIMEOUT", "5"))
+DB_CACHED_STATEMENTS = int(os.environ.get("DB_CACHED_STATEMENTS", "256"))
+
+_local = threading.local()
+
+# 批量导入时并发获取基金信息的线程数，以及每个数据源的最小请求间隔（秒）
+FUND_INFO_WORKERS = int(os.environ.get("FUND_INFO_WORKERS", "8"))
+FUND_INFO_MIN_INTERVAL = float(os.environ.get("FUND_INFO_MIN_INTERVAL", "0.1"))
+
+# funds 表的列顺序，批量写入时按此顺序组织参数
+FUND_COLUMNS = (
+    "code",
+    "name",
+    "full_name",
+    "manager",
+    "fund_type",
+    "fund_company",
+    "establish_date",
+    "latest_scale",
+    "custodian_bank",
+    "benchmark",
+)
+
+# 列表页使用的播客摘要字段，不含体积较大的 transcript
+PODCAST_SUMMARY_COLUMNS = (
+    "id",
+    "fund_code",
+    "report_period",
+    "title",
+    "audio_url",
+    "duration",
+    "status",
+    "error_msg",
+    "created_at",
+)
+
+# 基金季报公告索引，下载流程可能在未调用 init_db 的脚本中运行，因此按需建表
+# 公告索引：dedupe_key 为公告ID，列表没有ID列时为公告链接；report_id 只存真实的公告ID（AN 开头）
+_ANNOUNCEMENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fund_announcements (
+    fund_code TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    report_id TEXT,
+    title TEXT NOT NULL,
+    publish_date TEXT,
+    url TEXT,
+    report_year INTEGER NOT NULL DEFAULT 0,
+    report_quarter INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fund_code, dedupe_key)
+);
+CREATE TABLE IF NOT EXISTS fund_announcement_refresh (
+    fund_code TEXT PRIMARY KEY,
+    refreshed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fund_announcements_period
+    ON fund_announcements(fund_code, report_year, report_quarter);
+"""
+_announcement_schema_ready = False
+
+# 基金搜索全文索引：外部内容表指向 funds，触发器保持同步；
+# trigram 分词支持中文任意子串匹配，但查询词至少需要 3 个字符，更短的查询走 LIKE
+FUNDS_FTS_COLUMNS = ("code", "name", "full_name", "manager", "fund_company")
+_FUNDS_FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE funds_fts USING fts5(
+    {", ".join(FUNDS_FTS_COLUMNS)},
+    content='funds', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER funds_fts_insert AFTER INSERT ON funds BEGIN
+    INSERT INTO funds_fts(rowid, {", ".join(FUNDS_FTS_COLUMNS)})
+    VALUES (new.rowid, {", ".join(f"new.{col}" for col in FUNDS_FTS_COLUMNS)});
+END;
+CREATE TRIGGER funds_fts_delete AFTER DELETE ON funds BEGIN
+    INSERT INTO funds_fts(funds_fts, rowid, {", ".join(FUNDS_FTS_COLUMNS)})
+    VALUES ('delete', old.rowid, {", ".join(f"old.{col}" for col in FUNDS_FTS_COLUMNS)});
+END;
+CREATE TRIGGER funds_fts_update AFTER UPDATE ON funds BEGIN
+    INSERT INTO funds_fts(funds_fts, rowid, {", ".join(FUNDS_FTS_COLUMNS)})
+    VALUES ('delete', old.rowid, {", ".join(f"old.{col}" for col in FUNDS_FTS_COLUMNS)});
+    INSERT INTO funds_fts(rowid, {", ".join(FUNDS_FTS_COLUMNS)})
+    VALUES (new.rowid, {", ".join(f"new.{col}" for col in FUNDS_FTS_COLUMNS)});
+END;
+INSERT INTO funds_fts(funds_fts) VALUES ('rebuild');
+"""
+FTS_MIN_QUERY_LENGTH = 3
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+def _get_fund_info_by_akshare(fund_code: str, min_interval: float = 0.0) -> Optional[Dict]:
+    """使用 akshare 获取基金基本信息；min_interval 为对每个数据源的最小请求间隔（秒）"""
     try:
         import akshare as ak
 
         try:
+            throttle(XUEQIU_HOST, min_interval)
             info_df = ak.fund_individual_basic_info_xq(symbol=fund_code)
             if info_df is not None and not info_df.empty:
-                info_map = {
-                    str(row["item"]).strip(): str(row["value"]).strip()
-                    for _, row in info_df.iterrows()
-                }
+                info_map = dict(
+                    zip(
+                        info_df["item"].astype(str).str.strip(),
+                        info_df["value"].astype(str).str.strip(),
+                    )
+                )
                 return {
                     "code": fund_code,
                     "name": info_map.get("基金名称", fund_code),
@@ -33,6 +132,7 @@ def _get_fund_info_by_akshare(fund_code: str) -> Optional[Dict]:
         except Exception:
             pass
         try:
+            throttle(EASTMONEY_HOST, min_interval)
             announcement_df = ak.fund_announcement_personnel_em(symbol=fund_code)
             if announcement_df is not None and not announcement_df.empty:
                 name_col = None
@@ -63,12 +163,43 @@ def _get_fund_info_by_akshare(fund_code: str) -> Optional[Dict]:
 
 
 def _get_connection() -> sqlite3.Connection:
+    """返回当前线程复用的连接
+
+    每个线程持有一个长连接（sqlite3 连接不能跨线程使用），按进程号和数据库路径区分，
+    fork 出的子进程会重新连接。调用方无需关闭连接；写入放在 with conn: 中，
+    成功时提交、异常时当场回滚，不会把未提交的事务留给同一线程的下一次调用。
+    """
+    key = (os.getpid(), str(DB_PATH))
+    conn = getattr(_local, "connections", {}).get(key)
+    if conn is None:
+        conn = _connect()
+        _local.connections = {key: conn}
+    return conn
+
+
+def _connect() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
+    conn = sqlite3.connect(
+        str(DB_PATH),
+        timeout=DB_BUSY_TIMEOUT,
+        cached_statements=DB_CACHED_STATEMENTS,
+    )
     conn.row_factory = sqlite3.Row
+    # WAL 下读写互不阻塞，API 轮询与后台任务写入可以并发；
+    # synchronous=NORMAL 在 WAL 下只在检查点时 fsync，断电最多丢失最近的提交，不会损坏数据库
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}")
     return conn
 
 
+def close_connection() -> None:
+    """关闭当前线程的连接，线程退出前或测试切换数据库时调用"""
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
+
+
 def init_db() -> None:
     conn = _get_connection()
     conn.executescript(
@@ -105,14 +236,44 @@ def init_db() -> None:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             UNIQUE(fund_code, report_period)
         );
+        CREATE TABLE IF NOT EXISTS report_viewpoints (
+            fund_code TEXT NOT NULL,
+            report_period TEXT NOT NULL,
+            viewpoint TEXT NOT NULL,
+            fund_info TEXT,
+            extractor_version TEXT NOT NULL,
+            source_pdf_hash TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (fund_code, report_period)
+        );
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            dedupe_key TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            available_at REAL NOT NULL,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            heartbeat_at REAL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_key
+            ON jobs(kind, dedupe_key) WHERE status IN ('queued', 'running');
+        CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(kind, status, available_at);
         CREATE INDEX IF NOT EXISTS idx_user_funds_device ON user_funds(device_id);
         CREATE INDEX IF NOT EXISTS idx_podcasts_status ON podcasts(status);
         """
     )
-    _migrate_funds_table(conn)
-    conn.commit()
+    with conn:
+        _ensure_announcement_schema(conn)
+        _migrate_funds_table(conn)
+        _ensure_funds_fts(conn)
     _seed_funds(conn)
-    conn.close()
 
 
 def _migrate_funds_table(conn: sqlite3.Connection) -> None:
@@ -131,6 +292,36 @@ def _migrate_funds_table(conn: sqlite3.Connection) -> None:
             conn.execute(f"ALTER TABLE funds ADD COLUMN {col_name} {col_type}")
 
 
+def _ensure_announcement_schema(conn: sqlite3.Connection) -> None:
+    """创建公告索引表；旧表把公告链接存在 report_id 中，索引可以重新拉取，直接重建"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(fund_announcements)").fetchall()]
+    if columns and "dedupe_key" not in columns:
+        conn.execute("DROP TABLE fund_announcements")
+        conn.execute("DROP TABLE IF EXISTS fund_announcement_refresh")
+    conn.executescript(_ANNOUNCEMENT_SCHEMA)
+
+
+def _ensure_funds_fts(conn: sqlite3.Connection) -> None:
+    """首次运行时创建全文索引并用现有数据重建；SQLite 未编译 FTS5 时搜索回落到 LIKE"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funds_fts'"
+    ).fetchone()
+    if exists:
+        return
+    try:
+        conn.executescript(_FUNDS_FTS_SCHEMA)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"创建基金全文索引失败，搜索使用 LIKE: {e}")
+
+
+def _has_funds_fts(conn: sqlite3.Connection) -> bool:
+    return bool(
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funds_fts'"
+        ).fetchone()
+    )
+
+
 def _seed_funds(conn: sqlite3.Connection) -> None:
     count = conn.execute("SELECT COUNT(1) FROM funds").fetchone()[0]
     if count:
@@ -140,18 +331,24 @@ def _seed_funds(conn: sqlite3.Connection) -> None:
         ("003095", "中欧医疗健康混合A", None, "葛兰", "混合型-偏股", None, None, None, None, None),
         ("161725", "招商中证白酒指数", None, "侯昊", "指数型-股票", None, None, None, None, None),
     ]
-    conn.executemany(
-        "INSERT INTO funds (code, name, full_name, manager, fund_type, fund_company, establish_date, latest_scale, custodian_bank, benchmark) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        funds,
-    )
-    conn.commit()
+    with conn:
+        conn.executemany(
+            "INSERT INTO funds (code, name, full_name, manager, fund_type, fund_company, establish_date, latest_scale, custodian_bank, benchmark) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            funds,
+        )
 
 
 def _save_fund_info(conn: sqlite3.Connection, fund_info: Dict) -> None:
     conn.execute(
-        """INSERT OR REPLACE INTO funds 
-           (code, name, full_name, manager, fund_type, fund_company, establish_date, latest_scale, custodian_bank, benchmark) 
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        # 使用 UPSERT 而非 INSERT OR REPLACE：REPLACE 会换新 rowid 且默认不触发删除触发器，全文索引会残留旧行
+        """INSERT INTO funds
+           (code, name, full_name, manager, fund_type, fund_company, establish_date, latest_scale, custodian_bank, benchmark)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT(code) DO UPDATE SET
+               name = excluded.name, full_name = excluded.full_name, manager = excluded.manager,
+               fund_type = excluded.fund_type, fund_company = excluded.fund_company,
+               establish_date = excluded.establish_date, latest_scale = excluded.latest_scale,
+               custodian_bank = excluded.custodian_bank, benchmark = excluded.benchmark""",
         (
             fund_info["code"],
             fund_info["name"],
@@ -167,114 +364,211 @@ def _save_fund_info(conn: sqlite3.Connection, fund_info: Dict) -> None:
     )
 
 
-def search_funds(query: str) -> List[Dict[str, Any]]:
+def search_funds(
+    query: str, limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0
+) -> List[Dict[str, Any]]:
+    """按代码、名称、全称、基金经理、基金公司搜索基金，分页返回
+
+    代码完全匹配排在最前，其次是代码前缀匹配，再按全文检索相关度排序；
+    空查询按代码顺序分页返回。
+    """
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    offset = max(0, offset)
+    query = query.strip()
     conn = _get_connection()
     if not query:
-        rows = conn.execute("SELECT * FROM funds ORDER BY code").fetchall()
-    else:
-        like_query = f"%{query}%"
         rows = conn.execute(
-            "SELECT * FROM funds WHERE code LIKE ? OR name LIKE ? ORDER BY code",
-            (like_query, like_query),
+            "SELECT * FROM funds ORDER BY code LIMIT ? OFFSET ?", (limit, offset)
         ).fetchall()
-        
-        if not rows and query.isdigit() and len(query) == 6:
-            fund_info = _get_fund_info_by_akshare(query)
-            if fund_info:
+        return [dict(row) for row in rows]
+
+    rows = _search_funds_rows(conn, query, limit, offset)
+    if not rows and offset == 0 and query.isdigit() and len(query) == 6:
+        fund_info = _get_fund_info_by_akshare(query)
+        if fund_info:
+            with conn:
                 _save_fund_info(conn, fund_info)
-                conn.commit()
-                rows = conn.execute(
-                    "SELECT * FROM funds WHERE code LIKE ? OR name LIKE ? ORDER BY code",
-                    (like_query, like_query),
-                ).fetchall()
-    
-    conn.close()
+            rows = _search_funds_rows(conn, query, limit, offset)
     return [dict(row) for row in rows]
 
 
-def batch_import_funds(fund_codes: List[str]) -> Dict[str, Any]:
-    """批量导入基金信息到数据库"""
-    results = {"success": [], "failed": []}
+def _search_funds_rows(
+    conn: sqlite3.Connection, query: str, limit: int, offset: int
+) -> List[sqlite3.Row]:
+    if len(query) >= FTS_MIN_QUERY_LENGTH and _has_funds_fts(conn):
+        # 整体作为短语匹配，双引号转义后用户输入中的 FTS 语法不会生效
+        phrase = '"' + query.replace('"', '""') + '"'
+        return conn.execute(
+            """
+            SELECT f.* FROM funds_fts
+            JOIN funds f ON f.rowid = funds_fts.rowid
+            WHERE funds_fts MATCH ?
+            ORDER BY f.code = ? DESC, f.code LIKE ? DESC, funds_fts.rank, f.code
+            LIMIT ? OFFSET ?
+            """,
+            (phrase, query, f"{query}%", limit, offset),
+        ).fetchall()
+    # 查询词过短，trigram 索引无法使用；数据量为基金全集时全表扫描仍在毫秒级
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    conditions = " OR ".join(f"{col} LIKE ? ESCAPE '\\'" for col in FUNDS_FTS_COLUMNS)
+    return conn.execute(
+        f"""
+        SELECT * FROM funds
+        WHERE {conditions}
+        ORDER BY code = ? DESC, code LIKE ? DESC, name LIKE ? DESC, code
+        LIMIT ? OFFSET ?
+        """,
+        (*([pattern] * len(FUNDS_FTS_COLUMNS)), query, f"{query}%", f"{query}%", limit, offset),
+    ).fetchall()
+
+
+def bulk_upsert_funds(rows: List[Tuple]) -> Dict[str, int]:
+    """在单个事务中批量写入基金，rows 中每项按 FUND_COLUMNS 顺序排列
+
+    已存在的基金只更新名称与非空字段，不会用空值覆盖逐只导入得到的详细信息；
+    内容未变化的行不写入，避免重复导入时触发全文索引更新。返回新增与更新的数量。
+    """
+    detail_columns = FUND_COLUMNS[2:]
+    changed = " OR ".join(
+        f"funds.{col} IS NOT COALESCE(excluded.{col}, funds.{col})" for col in detail_columns
+    )
+    sql = f"""
+        INSERT INTO funds ({", ".join(FUND_COLUMNS)})
+        VALUES ({", ".join("?" for _ in FUND_COLUMNS)})
+        ON CONFLICT(code) DO UPDATE SET
+            name = excluded.name,
+            {", ".join(f"{col} = COALESCE(excluded.{col}, funds.{col})" for col in detail_columns)}
+        WHERE funds.name IS NOT excluded.name OR {changed}
+    """
     conn = _get_connection()
-    
-    for code in fund_codes:
-        code = code.strip()
+    before = conn.execute("SELECT COUNT(1) FROM funds").fetchone()[0]
+    with conn:
+        # executemany 的 rowcount 只统计对 funds 的直接写入，不含触发器对全文索引的写入
+        written = conn.executemany(sql, rows).rowcount
+    inserted = conn.execute("SELECT COUNT(1) FROM funds").fetchone()[0] - before
+    return {"total": len(rows), "inserted": inserted, "updated": written - inserted}
+
+
+def batch_import_funds(
+    fund_codes: List[str],
+    on_progress: Optional[Callable[[Dict[str, Any], int, int], None]] = None,
+) -> Dict[str, Any]:
+    """批量导入基金信息到数据库
+
+    已存在的基金用一次查询过滤，其余基金在线程池中并发获取（FUND_INFO_WORKERS 个线程，
+    每个数据源按 FUND_INFO_MIN_INTERVAL 限速），获取期间不占用数据库事务，最后一次性写入。
+    重复的代码只处理一次。on_progress(item, done, total) 在每只基金处理完成时调用。
+    """
+    codes = list(dict.fromkeys(code.strip() for code in fund_codes))
+    total = len(codes)
+    outcomes: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
+    def report(code: str, status: str, item: Dict[str, Any]) -> None:
+        outcomes[code] = (status, item)
+        if on_progress is not None:
+            on_progress({"status": status, **item}, len(outcomes), total)
+
+    valid = []
+    for code in codes:
         if not code or not code.isdigit() or len(code) != 6:
-            results["failed"].append({"code": code, "reason": "无效的基金代码格式"})
-            continue
-            
-        existing = conn.execute("SELECT code FROM funds WHERE code = ?", (code,)).fetchone()
-        if existing:
-            results["success"].append({"code": code, "reason": "已存在"})
-            continue
-            
-        fund_info = _get_fund_info_by_akshare(code)
-        if fund_info:
-            _save_fund_info(conn, fund_info)
-            results["success"].append({"code": code, "name": fund_info["name"]})
+            report(code, "failed", {"code": code, "reason": "无效的基金代码格式"})
         else:
-            results["failed"].append({"code": code, "reason": "无法获取基金信息"})
-    
-    conn.commit()
-    conn.close()
+            valid.append(code)
+
+    conn = _get_connection()
+    existing = {
+        row["code"]
+        for row in conn.execute(
+            # json_each 展开参数数组，代码数量不受 SQLite 变量个数上限限制
+            "SELECT code FROM funds WHERE code IN (SELECT value FROM json_each(?))",
+            (json.dumps(valid),),
+        ).fetchall()
+    }
+    missing = []
+    for code in valid:
+        if code in existing:
+            report(code, "success", {"code": code, "reason": "已存在"})
+        else:
+            missing.append(code)
+
+    rows = []
+    if missing:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(FUND_INFO_WORKERS, len(missing))),
+            thread_name_prefix="fund-info",
+        ) as pool:
+            futures = {
+                pool.submit(_get_fund_info_by_akshare, code, FUND_INFO_MIN_INTERVAL): code
+                for code in missing
+            }
+            for future in as_completed(futures):
+                code = futures[future]
+                fund_info = future.result()
+                if fund_info:
+                    rows.append(tuple(fund_info.get(col) for col in FUND_COLUMNS))
+                    report(code, "success", {"code": code, "name": fund_info["name"]})
+                else:
+                    report(code, "failed", {"code": code, "reason": "无法获取基金信息"})
+    if rows:
+        bulk_upsert_funds(rows)
+
+    results = {"success": [], "failed": []}
+    for code in codes:
+        status, item = outcomes[code]
+        results[status].append(item)
     return results
 
 
 def get_fund_by_code(fund_code: str) -> Optional[Dict[str, Any]]:
     conn = _get_connection()
     row = conn.execute("SELECT * FROM funds WHERE code = ?", (fund_code,)).fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
 def add_user_fund(device_id: str, fund_code: str) -> None:
     conn = _get_connection()
-    conn.execute(
-        "INSERT OR IGNORE INTO user_funds (device_id, fund_code) VALUES (?, ?)",
-        (device_id, fund_code),
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO user_funds (device_id, fund_code) VALUES (?, ?)",
+            (device_id, fund_code),
+        )
 
 
 def delete_user_fund(device_id: str, fund_code: str) -> None:
     conn = _get_connection()
-    conn.execute(
-        "DELETE FROM user_funds WHERE device_id = ? AND fund_code = ?",
-        (device_id, fund_code),
-    )
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(
+            "DELETE FROM user_funds WHERE device_id = ? AND fund_code = ?",
+            (device_id, fund_code),
+        )
 
 
 def list_user_funds(device_id: str) -> List[Dict[str, Any]]:
+    """关注的基金及其播客摘要；一次联表查询，不含 transcript，完整内容通过 get_podcast 获取"""
     conn = _get_connection()
     rows = conn.execute(
-        """
-        SELECT f.code, f.name, f.full_name, f.manager, f.fund_type, f.fund_company, 
-               f.establish_date, f.latest_scale, f.custodian_bank, f.benchmark, uf.created_at
+        f"""
+        SELECT f.code, f.name, f.full_name, f.manager, f.fund_type, f.fund_company,
+               f.establish_date, f.latest_scale, f.custodian_bank, f.benchmark, uf.created_at,
+               {", ".join(f"p.{col} AS podcast_{col}" for col in PODCAST_SUMMARY_COLUMNS)}
         FROM user_funds uf
         JOIN funds f ON uf.fund_code = f.code
+        LEFT JOIN podcasts p ON p.fund_code = f.code
         WHERE uf.device_id = ?
-        ORDER BY uf.created_at DESC
+        ORDER BY uf.created_at DESC, uf.id DESC, p.report_period DESC
         """,
         (device_id,),
     ).fetchall()
-    items = []
+    funds: Dict[str, Dict[str, Any]] = {}
     for row in rows:
-        fund = dict(row)
-        podcasts = conn.execute(
-            """
-            SELECT * FROM podcasts
-            WHERE fund_code = ?
-            ORDER BY report_period DESC
-            """,
-            (fund["code"],),
-        ).fetchall()
-        fund["podcasts"] = [_row_to_podcast(p) for p in podcasts] if podcasts else []
-        items.append(fund)
-    conn.close()
-    return items
+        fund = funds.get(row["code"])
+        if fund is None:
+            fund = {key: row[key] for key in row.keys() if not key.startswith("podcast_")}
+            fund["podcasts"] = []
+            funds[row["code"]] = fund
+        if row["podcast_id"] is not None:
+            fund["podcasts"].append({col: row[f"podcast_{col}"] for col in PODCAST_SUMMARY_COLUMNS})
+    return list(funds.values())
 
 
 def list_all_funds() -> List[Dict[str, Any]]:
@@ -288,7 +582,6 @@ def list_all_funds() -> List[Dict[str, Any]]:
         ORDER BY code
         """
     ).fetchall()
-    conn.close()
     return [dict(row) for row in rows]
 
 
@@ -297,16 +590,311 @@ def delete_fund(fund_code: str) -> bool:
     conn = _get_connection()
     existing = conn.execute("SELECT code FROM funds WHERE code = ?", (fund_code,)).fetchone()
     if not existing:
-        conn.close()
         return False
-    conn.execute("DELETE FROM podcasts WHERE fund_code = ?", (fund_code,))
-    conn.execute("DELETE FROM user_funds WHERE fund_code = ?", (fund_code,))
-    conn.execute("DELETE FROM funds WHERE code = ?", (fund_code,))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("DELETE FROM podcasts WHERE fund_code = ?", (fund_code,))
+        conn.execute("DELETE FROM report_viewpoints WHERE fund_code = ?", (fund_code,))
+        conn.execute("DELETE FROM fund_announcements WHERE fund_code = ?", (fund_code,))
+        conn.execute("DELETE FROM fund_announcement_refresh WHERE fund_code = ?", (fund_code,))
+        conn.execute("DELETE FROM user_funds WHERE fund_code = ?", (fund_code,))
+        conn.execute("DELETE FROM funds WHERE code = ?", (fund_code,))
     return True
 
 
+def get_cached_viewpoint(
+    fund_code: str, report_period: str, extractor_version: str
+) -> Optional[Dict[str, Any]]:
+    """读取观点缓存，提取器版本不一致视为未命中"""
+    conn = _get_connection()
+    row = conn.execute(
+        """
+        SELECT viewpoint, fund_info, source_pdf_hash FROM report_viewpoints
+        WHERE fund_code = ? AND report_period = ? AND extractor_version = ?
+        """,
+        (fund_code, report_period, extractor_version),
+    ).fetchone()
+    if not row:
+        return None
+    data = dict(row)
+    try:
+        data["fund_info"] = json.loads(data["fund_info"]) if data["fund_info"] else {}
+    except json.JSONDecodeError:
+        return None
+    return data
+
+
+def save_cached_viewpoint(
+    fund_code: str,
+    report_period: str,
+    viewpoint: str,
+    fund_info: Dict[str, Any],
+    extractor_version: str,
+    source_pdf_hash: Optional[str],
+) -> None:
+    conn = _get_connection()
+    with conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO report_viewpoints
+            (fund_code, report_period, viewpoint, fund_info, extractor_version, source_pdf_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                fund_code,
+                report_period,
+                viewpoint,
+                json.dumps(fund_info, ensure_ascii=False),
+                extractor_version,
+                source_pdf_hash,
+            ),
+        )
+
+
+def _get_announcement_connection() -> sqlite3.Connection:
+    global _announcement_schema_ready
+    conn = _get_connection()
+    if not _announcement_schema_ready:
+        with conn:
+            _ensure_announcement_schema(conn)
+        _announcement_schema_ready = True
+    return conn
+
+
+def is_announcement_index_fresh(fund_code: str, ttl_seconds: float) -> bool:
+    """公告索引在 ttl_seconds 内刷新过则视为新鲜"""
+    conn = _get_announcement_connection()
+    row = conn.execute(
+        "SELECT refreshed_at FROM fund_announcement_refresh WHERE fund_code = ?",
+        (fund_code,),
+    ).fetchone()
+    return bool(row) and time.time() - row["refreshed_at"] < ttl_seconds
+
+
+def upsert_announcements(fund_code: str, announcements: List[Dict[str, Any]]) -> int:
+    """增量写入公告索引并记录刷新时间，返回新增的公告数"""
+    conn = _get_announcement_connection()
+    with conn:
+        before = conn.total_changes
+        conn.executemany(
+            """
+            INSERT INTO fund_announcements
+            (fund_code, dedupe_key, report_id, title, publish_date, url, report_year, report_quarter)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(fund_code, dedupe_key) DO NOTHING
+            """,
+            [
+                (
+                    fund_code,
+                    item["dedupe_key"],
+                    item.get("report_id"),
+                    item["title"],
+                    item.get("publish_date"),
+                    item.get("url"),
+                    item.get("report_year", 0),
+                    item.get("report_quarter", 0),
+                )
+                for item in announcements
+            ],
+        )
+        inserted = conn.total_changes - before
+        conn.execute(
+            "INSERT OR REPLACE INTO fund_announcement_refresh (fund_code, refreshed_at) VALUES (?, ?)",
+            (fund_code, time.time()),
+        )
+    return inserted
+
+
+def find_quarter_announcement(
+    fund_code: str, report_year: Optional[int] = None, report_quarter: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """查找指定报告期的季报公告；不指定报告期时返回最新发布的季报公告"""
+    conn = _get_announcement_connection()
+    if report_year is None or report_quarter is None:
+        row = conn.execute(
+            """
+            SELECT * FROM fund_announcements WHERE fund_code = ?
+            ORDER BY publish_date DESC LIMIT 1
+            """,
+            (fund_code,),
+        ).fetchone()
+    else:
+        row = conn.execute(
+            """
+            SELECT * FROM fund_announcements
+            WHERE fund_code = ? AND report_year = ? AND report_quarter = ?
+            ORDER BY publish_date DESC LIMIT 1
+            """,
+            (fund_code, report_year, report_quarter),
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def enqueue_job(
+    kind: str, dedupe_key: str, payload: List[Any], max_attempts: int = 3
+) -> Optional[int]:
+    """写入任务；同一去重键已有排队或运行中的任务时返回 None"""
+    conn = _get_connection()
+    with conn:
+        cursor = conn.execute(
+            """
+            INSERT OR IGNORE INTO jobs (kind, dedupe_key, payload, max_attempts, available_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (kind, dedupe_key, json.dumps(payload, ensure_ascii=False), max_attempts, time.time()),
+        )
+    job_id = cursor.lastrowid if cursor.rowcount else None
+    return job_id
+
+
+def find_active_job(kind: str, dedupe_key: str) -> Optional[Dict[str, Any]]:
+    conn = _get_connection()
+    row = conn.execute(
+        "SELECT * FROM jobs WHERE kind = ? AND dedupe_key = ? AND status IN ('queued', 'running')",
+        (kind, dedupe_key),
+    ).fetchone()
+    return _row_to_job(row)
+
+
+def count_queued_jobs(kind: str) -> int:
+    conn = _get_connection()
+    count = conn.execute(
+        "SELECT COUNT(1) FROM jobs WHERE kind = ? AND status = 'queued'", (kind,)
+    ).fetchone()[0]
+    return count
+
+
+def get_job_position(kind: str, dedupe_key: str) -> Optional[int]:
+    """运行中返回 0，排队中返回从 1 开始的位置，没有活动任务返回 None"""
+    conn = _get_connection()
+    row = conn.execute(
+        """
+        SELECT status, available_at, id FROM jobs
+        WHERE kind = ? AND dedupe_key = ? AND status IN ('queued', 'running')
+        """,
+        (kind, dedupe_key),
+    ).fetchone()
+    if not row:
+        return None
+    if row["status"] == "running":
+        return 0
+    ahead = conn.execute(
+        """
+        SELECT COUNT(1) FROM jobs
+        WHERE kind = ? AND status = 'queued'
+          AND (available_at < ? OR (available_at = ? AND id < ?))
+        """,
+        (kind, row["available_at"], row["available_at"], row["id"]),
+    ).fetchone()[0]
+    return ahead + 1
+
+
+def claim_job(kind: str, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+    """原子地领取一个到期的排队任务并加租约，attempts 加一"""
+    now = time.time()
+    conn = _get_connection()
+    with conn:
+        row = conn.execute(
+            """
+            UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE kind = ? AND status = 'queued' AND available_at <= ?
+                ORDER BY available_at, id LIMIT 1
+            )
+            RETURNING *
+            """,
+            (owner, now + lease_seconds, now, kind, now),
+        ).fetchone()
+    return _row_to_job(row)
+
+
+def heartbeat_job(job_id: int, owner: str, lease_seconds: float) -> bool:
+    """续租；租约已被回收（不再属于 owner）时返回 False"""
+    now = time.time()
+    conn = _get_connection()
+    with conn:
+        cursor = conn.execute(
+            """
+            UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ?
+            WHERE id = ? AND lease_owner = ? AND status = 'running'
+            """,
+            (now + lease_seconds, now, job_id, owner),
+        )
+    return cursor.rowcount > 0
+
+
+def complete_job(job_id: int, owner: str) -> None:
+    conn = _get_connection()
+    with conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND lease_owner = ?
+            """,
+            (job_id, owner),
+        )
+
+
+def fail_job(job_id: int, owner: str, error: str, retry_delay: float) -> bool:
+    """记录失败；未达到最大次数时延迟 retry_delay 秒后重新排队，返回是否会重试"""
+    conn = _get_connection()
+    with conn:
+        cursor = conn.execute(
+            """
+            UPDATE jobs SET
+                status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                available_at = ?, last_error = ?, lease_owner = NULL, lease_expires_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND lease_owner = ?
+            RETURNING status
+            """,
+            (time.time() + retry_delay, error, job_id, owner),
+        )
+        row = cursor.fetchone()
+    return bool(row) and row["status"] == "queued"
+
+
+def reclaim_expired_jobs(kind: str) -> List[Dict[str, Any]]:
+    """回收租约过期的运行中任务（进程崩溃或重启），返回被回收的任务
+
+    未达到最大次数的任务立即重新排队，否则标记为失败；返回值中的 status 为回收后的状态。
+    """
+    conn = _get_connection()
+    with conn:
+        rows = conn.execute(
+            """
+            UPDATE jobs SET
+                status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+                available_at = ?, last_error = '租约过期，任务被回收',
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE kind = ? AND status = 'running' AND lease_expires_at < ?
+            RETURNING *
+            """,
+            (time.time(), kind, time.time()),
+        ).fetchall()
+    return [_row_to_job(row) for row in rows]
+
+
+def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if not row:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    return job
+
+
+def list_unfinished_podcasts() -> List[Dict[str, Any]]:
+    """状态停留在 pending/generating 的播客"""
+    conn = _get_connection()
+    rows = conn.execute(
+        "SELECT id, fund_code, report_period, status FROM podcasts WHERE status IN ('pending', 'generating')"
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
 def get_latest_podcast(fund_code: str, report_period: str) -> Optional[Dict[str, Any]]:
     conn = _get_connection()
     row = conn.execute(
@@ -317,23 +905,26 @@ def get_latest_podcast(fund_code: str, report_period: str) -> Optional[Dict[str,
         """,
         (fund_code, report_period),
     ).fetchone()
-    conn.close()
     return _row_to_podcast(row) if row else None
 
 
 def create_podcast_task(fund_code: str, report_period: str, title: str) -> int:
+    """创建播客记录并返回 id；并发请求已抢先创建同一基金与报告期时返回已有记录的 id"""
     conn = _get_connection()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO podcasts (fund_code, report_period, title, status)
+            VALUES (?, ?, ?, 'pending')
+            ON CONFLICT(fund_code, report_period) DO NOTHING
+            """,
+            (fund_code, report_period, title),
+        )
     row = conn.execute(
-        """
-        INSERT INTO podcasts (fund_code, report_period, title, status)
-        VALUES (?, ?, ?, 'pending')
-        """,
-        (fund_code, report_period, title),
-    )
-    conn.commit()
-    task_id = row.lastrowid
-    conn.close()
-    return task_id
+        "SELECT id FROM podcasts WHERE fund_code = ? AND report_period = ?",
+        (fund_code, report_period),
+    ).fetchone()
+    return row["id"]
 
 
 def update_podcast(podcast_id: int, updates: Dict[str, Any]) -> None:
@@ -344,15 +935,13 @@ def update_podcast(podcast_id: int, updates: Dict[str, Any]) -> None:
     columns = ", ".join([f"{key} = ?" for key in data.keys()])
     values = list(data.values())
     values.append(podcast_id)
-    conn.execute(f"UPDATE podcasts SET {columns} WHERE id = ?", values)
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(f"UPDATE podcasts SET {columns} WHERE id = ?", values)
 
 
 def get_podcast(podcast_id: int) -> Optional[Dict[str, Any]]:
     conn = _get_connection()
     row = conn.execute("SELECT * FROM podcasts WHERE id = ?", (podcast_id,)).fetchone()
-    conn.close()
     return _row_to_podcast(row) if row else None
 
 
@@ -362,7 +951,6 @@ def get_podcast_status(podcast_id: int) -> Optional[Dict[str, Any]]:
         "SELECT id, fund_code, report_period, status, audio_url, duration, error_msg FROM podcasts WHERE id = ?",
         (podcast_id,),
     ).fetchone()
-    conn.close()
     return dict(row) if row else None
 
 
@@ -370,12 +958,10 @@ def delete_podcast(podcast_id: int) -> Optional[Dict[str, Any]]:
     conn = _get_connection()
     row = conn.execute("SELECT * FROM podcasts WHERE id = ?", (podcast_id,)).fetchone()
     if not row:
-        conn.close()
         return None
     podcast = _row_to_podcast(row)
-    conn.execute("DELETE FROM podcasts WHERE id = ?", (podcast_id,))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("DELETE FROM podcasts WHERE id = ?", (podcast_id,))
     return podcast
 
 
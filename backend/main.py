@@ -1,8 +1,8 @@
 import asyncio
+import json
 import logging
 import os
 import sys
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -10,6 +10,7 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
@@ -17,6 +18,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from backend.database import (
+    SEARCH_DEFAULT_LIMIT,
     add_user_fund,
     batch_import_funds,
     create_podcast_task,
@@ -32,11 +34,18 @@ from backend.database import (
     search_funds,
     update_podcast,
 )
-from backend.services.ai_service import generate_dialogue_segments
-from backend.services.report_parser import get_report_viewpoint
-from backend.services.tts_service import synthesize_dialogue
+from backend.services.podcast_generator import (
+    AUDIO_DIR,
+    create_podcast_queue,
+    load_report_viewpoint,
+    podcast_job_key,
+    requeue_unfinished_podcasts,
+)
+from backend.services.report_async import shutdown_executors
 
 REPORT_PERIOD = "2024Q4"
+# 为 0 时 API 进程只负责入队，生成任务交给独立的 worker 进程（python -m backend.worker）
+PODCAST_INPROCESS_WORKER = os.environ.get("PODCAST_INPROCESS_WORKER", "1") != "0"
 
 
 class AddFundRequest(BaseModel):
@@ -64,19 +73,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-audio_dir = Path(__file__).resolve().parent / "audio"
+audio_dir = AUDIO_DIR
 audio_dir.mkdir(parents=True, exist_ok=True)
 app.mount("/audio", StaticFiles(directory=str(audio_dir)), name="audio")
 
 
 @app.on_event("startup")
-def on_startup():
-    init_db()
+async def on_startup():
+    await asyncio.to_thread(init_db)
+    # 重启前停留在 pending/generating 且没有活动任务的播客重新入队
+    await asyncio.to_thread(requeue_unfinished_podcasts, podcast_jobs)
+    if PODCAST_INPROCESS_WORKER:
+        podcast_jobs.start()
+    else:
+        logger.info("未启动进程内播客 worker，生成任务由独立 worker 进程处理")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await podcast_jobs.stop()
+    shutdown_executors()
 
 
 @app.get("/api/funds/search")
-def api_search_funds(q: Optional[str] = None):
-    return {"data": search_funds(q or "")}
+def api_search_funds(q: Optional[str] = None, limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0):
+    return {"data": search_funds(q or "", limit=limit, offset=offset)}
 
 
 @app.post("/api/funds")
@@ -97,13 +118,51 @@ def api_delete_fund(code: str, device_id: str):
 
 
 @app.post("/api/funds/batch-import")
-def api_batch_import_funds(payload: BatchImportRequest):
+async def api_batch_import_funds(payload: BatchImportRequest, stream: bool = False):
+    """stream=true 时以 NDJSON 逐行返回进度，最后一行为导入结果，避免大批量导入时请求超时"""
     logger.info(f"批量导入基金: {len(payload.fund_codes)} 个")
-    results = batch_import_funds(payload.fund_codes)
+    if stream:
+        return StreamingResponse(
+            stream_batch_import(payload.fund_codes), media_type="application/x-ndjson"
+        )
+    results = await asyncio.to_thread(batch_import_funds, payload.fund_codes)
     logger.info(f"导入完成: 成功 {len(results['success'])} 个, 失败 {len(results['failed'])} 个")
     return {"data": results}
 
 
+async def stream_batch_import(fund_codes: list[str]):
+    """在线程中执行导入，进度经队列转交给事件循环逐行输出
+
+    每行一个 JSON：{"type": "progress", "done", "total", "item"}，
+    结束时为 {"type": "result", "data"} 或 {"type": "error", "detail"}。
+    客户端中途断开时导入仍会在后台完成。
+    """
+    loop = asyncio.get_running_loop()
+    messages: asyncio.Queue = asyncio.Queue()
+
+    def on_progress(item: dict, done: int, total: int) -> None:
+        message = {"type": "progress", "done": done, "total": total, "item": item}
+        loop.call_soon_threadsafe(messages.put_nowait, message)
+
+    def run() -> None:
+        try:
+            results = batch_import_funds(fund_codes, on_progress=on_progress)
+            logger.info(f"导入完成: 成功 {len(results['success'])} 个, 失败 {len(results['failed'])} 个")
+            message = {"type": "result", "data": results}
+        except Exception as e:
+            logger.error(f"批量导入失败: {e}", exc_info=True)
+            message = {"type": "error", "detail": str(e)}
+        loop.call_soon_threadsafe(messages.put_nowait, message)
+
+    worker = asyncio.ensure_future(asyncio.to_thread(run))
+    while True:
+        message = await messages.get()
+        yield json.dumps(message, ensure_ascii=False) + "\n"
+        if message["type"] != "progress":
+            break
+    await worker
+
+
 @app.get("/api/funds/all")
 def api_list_all_funds():
     return {"data": list_all_funds()}
@@ -119,7 +178,7 @@ def api_delete_fund(code: str):
 
 
 @app.post("/api/podcasts/generate")
-async def api_generate_podcast(payload: GeneratePodcastRequest):
+def api_generate_podcast(payload: GeneratePodcastRequest):
     report_period = payload.report_period or REPORT_PERIOD
     logger.info(f"收到生成播客请求: fund_code={payload.fund_code}, report_period={report_period}")
     existing = get_latest_podcast(payload.fund_code, report_period)
@@ -127,6 +186,22 @@ async def api_generate_podcast(payload: GeneratePodcastRequest):
         logger.info(f"播客已完成，直接返回: id={existing['id']}")
         return {"data": existing}
     
+    job_key = podcast_job_key(payload.fund_code, report_period)
+    in_flight = podcast_jobs.find(job_key)
+    if in_flight is not None:
+        podcast_id = in_flight["payload"][0]
+        logger.info(f"已有进行中的生成任务，直接返回: id={podcast_id}")
+        return {
+            "data": {
+                "id": podcast_id,
+                "status": "generating",
+                "estimated_time": 120,
+                "queue_position": podcast_jobs.position(job_key),
+            }
+        }
+    if podcast_jobs.is_full():
+        raise HTTPException(status_code=503, detail="生成队列已满，请稍后再试")
+    
     task_id = None
     if existing:
         logger.info(f"重新生成播客: id={existing['id']}, status={existing['status']}")
@@ -146,13 +221,19 @@ async def api_generate_podcast(payload: GeneratePodcastRequest):
         task_id = create_podcast_task(payload.fund_code, report_period, title)
         logger.info(f"创建新播客任务: id={task_id}")
     
-    logger.info(f"启动生成任务: task_id={task_id}, fund_code={payload.fund_code}, report_period={report_period}")
-    asyncio.create_task(do_generate(task_id, payload.fund_code, report_period))
+    logger.info(f"加入生成队列: task_id={task_id}, fund_code={payload.fund_code}, report_period={report_period}")
+    if not podcast_jobs.submit(job_key, [task_id, payload.fund_code, report_period]):
+        # 并发请求已抢先入队，返回那个任务
+        in_flight = podcast_jobs.find(job_key)
+        if in_flight is not None:
+            task_id = in_flight["payload"][0]
+        logger.info(f"已有进行中的生成任务，直接返回: id={task_id}")
     return {
         "data": {
             "id": task_id,
             "status": "generating",
             "estimated_time": 120,
+            "queue_position": podcast_jobs.position(job_key),
         }
     }
 
@@ -166,15 +247,19 @@ def api_get_podcast(podcast_id: int):
 
 
 @app.get("/api/podcasts/{podcast_id}/status")
-async def api_get_podcast_status(podcast_id: int):
+def api_get_podcast_status(podcast_id: int):
     podcast = get_podcast_status(podcast_id)
     if not podcast:
         raise HTTPException(status_code=404, detail="Podcast not found")
+    # 0 表示正在生成，正整数为排队位置，不在队列中为 None
+    podcast["queue_position"] = podcast_jobs.position(
+        podcast_job_key(podcast["fund_code"], podcast["report_period"])
+    )
     return {"data": podcast}
 
 
 @app.delete("/api/podcasts/{podcast_id}")
-async def api_delete_podcast(podcast_id: int):
+def api_delete_podcast(podcast_id: int):
     podcast = delete_podcast(podcast_id)
     if not podcast:
         raise HTTPException(status_code=404, detail="Podcast not found")
@@ -194,7 +279,7 @@ async def api_delete_podcast(podcast_id: int):
 @app.get("/api/funds/{fund_code}/report/{report_period}")
 async def api_get_report_viewpoint(fund_code: str, report_period: str):
     try:
-        viewpoint, fund_info = get_report_viewpoint(fund_code, report_period)
+        viewpoint, fund_info = await load_report_viewpoint(fund_code, report_period)
         return {
             "data": {
                 "fund_code": fund_code,
@@ -208,44 +293,7 @@ async def api_get_report_viewpoint(fund_code: str, report_period: str):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-async def do_generate(task_id: int, fund_code: str, report_period: str):
-    logger.info(f"开始生成播客: task_id={task_id}, fund_code={fund_code}, report_period={report_period}")
-    try:
-        update_podcast(task_id, {"status": "generating"})
-        logger.info(f"更新状态为 generating: task_id={task_id}")
-        viewpoint, fund_info = get_report_viewpoint(fund_code, report_period)
-        logger.info(f"获取观点完成: has_viewpoint={bool(viewpoint)}, fund_name={fund_info.get('name')}")
-        if not viewpoint:
-            raise ValueError("未能提取观点")
-        segments = generate_dialogue_segments(
-            fund_name=fund_info["name"],
-            manager=fund_info["manager"],
-            report_period=report_period,
-            viewpoint=viewpoint,
-        )
-        logger.info(f"生成对话段完成: segments_count={len(segments)}")
-        audio_filename = f"{fund_code}_{report_period}_{int(datetime.utcnow().timestamp())}.mp3"
-        audio_path = audio_dir / audio_filename
-        logger.info(f"开始合成音频: path={audio_path}")
-        tts_result = await synthesize_dialogue(segments, str(audio_path))
-        logger.info(f"音频合成完成: result={bool(tts_result)}")
-        if not tts_result:
-            raise ValueError("音频生成失败")
-        audio_url = f"/audio/{audio_filename}"
-        update_podcast(
-            task_id,
-            {
-                "status": "completed",
-                "audio_url": audio_url,
-                "duration": tts_result["duration"],
-                "transcript": tts_result["transcript"],
-                "title": f"{fund_info['name']} {report_period} 季报解读",
-            },
-        )
-        logger.info(f"播客生成完成: task_id={task_id}, audio_url={audio_url}")
-    except Exception as exc:
-        logger.error(f"播客生成失败: task_id={task_id}, error={str(exc)}", exc_info=True)
-        update_podcast(task_id, {"status": "failed", "error_msg": str(exc)})
+podcast_jobs = create_podcast_queue()
 
 
 if __name__ == "__main__":
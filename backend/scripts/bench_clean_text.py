@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""clean_text / post_clean 微基准：对比逐次 re.sub 的旧实现与预编译正则的当前实现"""
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.services.report_parser import SAMPLE_REPORTS
+from fund_report_parser import clean_text, post_clean
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "reports"
+
+
+def legacy_clean_text(text: str) -> str:
+    """旧实现，仅用于对比"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"第\s*\d+\s*页\s*共\s*\d+\s*页", "", text)
+    text = re.sub(r"Page\s*\d+\s*of\s*\d+", "", text, flags=re.IGNORECASE)
+    text = re.sub(r"[\-–—]\s*\d+\s*[\-–—]", "", text)
+    text = re.sub(r"(?<!\n)\n(?!\n)", " ", text)
+    text = re.sub(r" +", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def legacy_post_clean(text: str) -> str:
+    """旧实现，仅用于对比"""
+    for prefix in ["报告期内，", "本报告期内，", "本基金", "2024年"]:
+        if text.startswith(prefix):
+            text = text[len(prefix) :].strip()
+    text = re.sub(r"\|\s*[^\|]+\s*\|", "", text)
+    noise_patterns = [
+        r"姓名\s+\w+\s+职务\s+基金经理",
+        r"4\.\d+\s*基金经理.*?简介",
+        r"4\.\d+\s*管理人对报告期内.*?说明",
+        r"投资策略和运作分析\s*[：:]?\s*\n?",
+        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年第[一二三四1234]季度报告",
+        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年中期报告",
+        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年度报告",
+    ]
+    for pattern in noise_patterns:
+        text = re.sub(pattern, "", text, flags=re.IGNORECASE)
+    stop_pattern = (
+        r"(报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警"
+        r"|重大事项提示|财务指标|投资组合报告|财务会计报告)"
+    )
+    text = re.split(stop_pattern, text, maxsplit=1)[0]
+    text = re.sub(r"(4\.\d+|第[一二三四五六七八]节)\s*$", "", text).strip()
+    cleaned_lines = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if len(line) < 3:
+            continue
+        if re.match(r"^[\d\s\.\-—]+$", line):
+            continue
+        if re.match(r"^姓名|职务|基金经理", line):
+            continue
+        if len(line) > 10 or re.search(r"[\u4e00-\u9fff]{3,}", line):
+            cleaned_lines.append(line)
+    result = "\n".join(cleaned_lines).strip()
+    return re.sub(r"\n{3,}", "\n\n", result)
+
+
+def load_texts(data_dir: Path) -> list[tuple[str, str]]:
+    texts = [(f"sample/{code}", text) for code, text in SAMPLE_REPORTS.items()]
+    pdf_files = sorted(data_dir.glob("*/*.pdf"))
+    if pdf_files:
+        from backend.services.pdf_text import extract_pdf_text
+
+        for pdf_path in pdf_files:
+            text = extract_pdf_text(pdf_path, targeted=False)
+            if text:
+                texts.append((f"{pdf_path.parent.name}/{pdf_path.name}", text))
+    return texts
+
+
+def bench(label: str, legacy, current, inputs: list[str], number: int) -> None:
+    mismatched = sum(legacy(text) != current(text) for text in inputs)
+    legacy_time = timeit.timeit(lambda: [legacy(text) for text in inputs], number=number)
+    current_time = timeit.timeit(lambda: [current(text) for text in inputs], number=number)
+    speedup = legacy_time / current_time if current_time else 0
+    print(
+        f"{label:<12} 输入 {len(inputs):>5} 条  旧 {legacy_time:.3f}s  新 {current_time:.3f}s"
+        f"  加速 {speedup:.1f}x  输出不一致 {mismatched}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="clean_text / post_clean 微基准")
+    parser.add_argument("-d", "--data-dir", default=str(DEFAULT_DATA_DIR), help="季报PDF缓存目录")
+    parser.add_argument("-n", "--number", type=int, default=20, help="重复次数")
+    args = parser.parse_args()
+
+    texts = load_texts(Path(args.data_dir))
+    print(f"共 {len(texts)} 份报告文本")
+    raw = [text for _, text in texts]
+    bench("clean_text", legacy_clean_text, clean_text, raw, args.number)
+
+    # post_clean 的输入是候选观点片段：按段落切分清洗后的报告
+    fragments = [
+        fragment
+        for text in raw
+        for fragment in clean_text(text).split("\n\n")
+        if fragment.strip()
+    ]
+    bench("post_clean", legacy_post_clean, post_clean, fragments, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""get_podcast_status 吞吐基准：对比每次新建连接的旧实现与线程复用连接的当前实现
+
+使用临时数据库，不影响 backend/data/funds.db。
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import backend.database as database
+
+
+def legacy_get_podcast_status(podcast_id: int):
+    """旧实现，仅用于对比：每次调用新建连接并关闭"""
+    database.DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(database.DB_PATH))
+    conn.row_factory = sqlite3.Row
+    row = conn.execute(
+        "SELECT id, fund_code, report_period, status, audio_url, duration, error_msg FROM podcasts WHERE id = ?",
+        (podcast_id,),
+    ).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+
+def _seed(podcasts: int) -> list:
+    conn = database._get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO podcasts (fund_code, report_period, title, status) VALUES (?, ?, ?, 'completed')",
+            [(f"{i:06d}", "2024Q4", f"播客 {i}") for i in range(podcasts)],
+        )
+    return [row[0] for row in conn.execute("SELECT id FROM podcasts").fetchall()]
+
+
+def _run(func, ids: list, requests: int, threads: int) -> float:
+    """返回每秒请求数"""
+    per_thread = requests // threads
+
+    def work(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            func(rng.choice(ids))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(work, range(threads)))
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_podcast_status 吞吐基准")
+    parser.add_argument("--requests", type=int, default=20000, help="每轮请求数")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8], help="并发线程数")
+    parser.add_argument("--podcasts", type=int, default=1000, help="测试数据行数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DB_PATH = Path(tmp_dir) / "bench.db"
+        database.init_db()
+        ids = _seed(args.podcasts)
+        for threads in args.threads:
+            legacy = _run(legacy_get_podcast_status, ids, args.requests, threads)
+            pooled = _run(database.get_podcast_status, ids, args.requests, threads)
+            print(
+                f"threads={threads:<3} 旧实现 {legacy:>9.0f} req/s  "
+                f"复用连接 {pooled:>9.0f} req/s  提升 {pooled / legacy:.1f}x"
+            )
+        database.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""对比各 PDF 文本后端在 backend/data/reports 下已缓存季报上的耗时与输出一致性"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.services.pdf_text import BACKEND_PDFIUM, BACKEND_PDFPLUMBER, extract_pdf_text
+from fund_report_parser import extract_manager_viewpoint
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "reports"
+BACKENDS = [BACKEND_PDFPLUMBER, BACKEND_PDFIUM]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", "", text or "")
+
+
+def bench_file(pdf_path: Path, targeted: bool) -> dict:
+    row = {"file": f"{pdf_path.parent.name}/{pdf_path.name}"}
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        text = extract_pdf_text(pdf_path, targeted=targeted, backend=backend)
+        row[f"{backend}_seconds"] = time.perf_counter() - start
+        row[f"{backend}_text"] = text or ""
+        row[f"{backend}_viewpoint"] = extract_manager_viewpoint(text) if text else None
+    base, fast = BACKENDS
+    row["text_equal"] = _normalize(row[f"{base}_text"]) == _normalize(row[f"{fast}_text"])
+    row["viewpoint_equal"] = row[f"{base}_viewpoint"] == row[f"{fast}_viewpoint"]
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF 文本后端基准测试")
+    parser.add_argument("-d", "--data-dir", default=str(DEFAULT_DATA_DIR), help="季报PDF缓存目录")
+    parser.add_argument("-p", "--period", help="只测试指定报告期，如 2025Q4")
+    parser.add_argument("--full", action="store_true", help="全文提取（默认只提取 §4 管理人报告页）")
+    args = parser.parse_args()
+
+    pattern = f"{args.period}_*.pdf" if args.period else "*.pdf"
+    pdf_files = sorted(Path(args.data_dir).glob(f"*/{pattern}"))
+    if not pdf_files:
+        print(f"未找到PDF: {args.data_dir}")
+        sys.exit(1)
+
+    base, fast = BACKENDS
+    print(f"{'文件':<50} {base:>11} {fast:>8} {'加速':>6} {'文本一致':>6} {'观点一致':>6}")
+    print("-" * 100)
+    rows = []
+    for pdf_path in pdf_files:
+        row = bench_file(pdf_path, targeted=not args.full)
+        rows.append(row)
+        base_time = row[f"{base}_seconds"]
+        fast_time = row[f"{fast}_seconds"]
+        speedup = base_time / fast_time if fast_time else 0
+        print(
+            f"{row['file'][:50]:<50} {base_time:>10.3f}s {fast_time:>7.3f}s {speedup:>5.1f}x"
+            f" {'✓' if row['text_equal'] else '✗':>6} {'✓' if row['viewpoint_equal'] else '✗':>6}"
+        )
+
+    base_total = sum(r[f"{base}_seconds"] for r in rows)
+    fast_total = sum(r[f"{fast}_seconds"] for r in rows)
+    print("-" * 100)
+    print(
+        f"共 {len(rows)} 份: {base} {base_total:.2f}s, {fast} {fast_total:.2f}s, "
+        f"加速 {base_total / fast_total if fast_total else 0:.1f}x"
+    )
+    print(
+        f"文本一致 {sum(r['text_equal'] for r in rows)}/{len(rows)}, "
+        f"观点一致 {sum(r['viewpoint_equal'] for r in rows)}/{len(rows)}"
+    )
+    mismatched = [r["file"] for r in rows if not r["viewpoint_equal"]]
+    if mismatched:
+        print("观点不一致:")
+        for name in mismatched:
+            print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
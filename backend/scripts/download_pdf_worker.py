@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
-"""独立的 PDF 下载工作脚本，通过 subprocess 调用，避免事件循环冲突"""
+"""独立的 PDF 下载工作脚本，通过 subprocess 调用，避免事件循环冲突
+
+单次模式：download_pdf_worker.py <url> <output_path>，输出一行 JSON 结果。
+常驻模式：download_pdf_worker.py --serve，浏览器只启动一次，从 stdin 逐行读取
+{"id", "url", "output_path"} 任务，向 stdout 逐行写出带相同 id 的 JSON 结果。
+日志写到 stderr，stdout 只用于协议输出。
+"""
 
 import sys
 import json
+import os
+import uuid
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
@@ -11,73 +19,202 @@ import asyncio
 import logging
 
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+# 常驻模式下同时打开的页面数
+MAX_PAGES = int(os.environ.get("PLAYWRIGHT_MAX_PAGES", "2"))
+# 等待下载事件或 PDF 响应的最长时间（秒）
+WAIT_TIMEOUT = float(os.environ.get("PLAYWRIGHT_WAIT_TIMEOUT", "60"))
+# 页面直接触发下载时 page.goto 会以这些错误结束，属于正常情况
+DOWNLOAD_ABORT_ERRORS = ("Download is starting", "net::ERR_ABORTED")
+
+
+async def _launch_browser(p):
+    browser = await p.chromium.launch(
+        headless=True,
+        args=["--no-sandbox", "--disable-setuid-sandbox"]
+    )
+    context = await browser.new_context(
+        user_agent=USER_AGENT,
+        viewport={"width": 1920, "height": 1080},
+        accept_downloads=True
+    )
+    return browser, context
+
+
+async def download_with_context(context, url: str, output_path: str) -> dict:
+    """在已有的浏览器上下文中打开新页面下载 PDF
+
+    同时监听下载事件和 application/pdf 网络响应，任一方拿到 PDF 字节即结束，
+    最多等待 WAIT_TIMEOUT 秒。字节先写临时文件，校验通过后原子重命名。
+    结束后仍在保存的下载由下载回调自行删除临时文件。
+    """
+    result = {"success": False, "error": None}
+    download_path = Path(output_path)
+    tmp_prefix = f".{download_path.name}.{uuid.uuid4().hex[:8]}"
+    response_tmp = download_path.with_name(f"{tmp_prefix}.response.part")
+    tmp_paths = [response_tmp]
+    done = asyncio.get_running_loop().create_future()
+
+    def finish(path: Path) -> None:
+        if not done.done():
+            done.set_result(path)
+
+    page = await context.new_page()
+
+    async def handle_download(download):
+        # 每个下载事件各用一个临时文件，互不覆盖
+        download_tmp = download_path.with_name(f"{tmp_prefix}.{len(tmp_paths)}.download.part")
+        tmp_paths.append(download_tmp)
+        try:
+            await download.save_as(download_tmp)
+        except Exception as e:
+            logger.debug("保存下载失败: %s", e)
+            download_tmp.unlink(missing_ok=True)
+            return
+        if done.done():
+            # 响应方式已胜出或已超时，清理时这里可能还没保存完，由回调自己删除
+            download_tmp.unlink(missing_ok=True)
+        else:
+            finish(download_tmp)
+
+    async def handle_response(response):
+        if done.done() or "application/pdf" not in response.headers.get("content-type", ""):
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            # 以下载方式返回的 PDF 拿不到响应体，交给下载事件处理
+            return
+        if body.startswith(b"%PDF-") and not done.done():
+            response_tmp.write_bytes(body)
+            finish(response_tmp)
+
+    page.on("download", handle_download)
+    page.on("response", handle_response)
+
+    def on_navigation_done(task: asyncio.Task) -> None:
+        # 导航本身失败（DNS、连接、证书错误等）时立即结束，不必等到超时
+        if task.cancelled() or done.done():
+            return
+        error = task.exception()
+        if error is not None and not any(text in str(error) for text in DOWNLOAD_ABORT_ERRORS):
+            done.set_exception(error)
+
+    navigation = asyncio.create_task(page.goto(url, wait_until="commit", timeout=WAIT_TIMEOUT * 1000))
+    navigation.add_done_callback(on_navigation_done)
+    try:
+        try:
+            saved_path = await asyncio.wait_for(done, timeout=WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            saved_path = None
+            result["error"] = f"等待PDF超时 ({WAIT_TIMEOUT}s)"
+
+        if saved_path and saved_path.exists():
+            with open(saved_path, "rb") as f:
+                header = f.read(5)
+            if header.startswith(b"%PDF-"):
+                os.replace(saved_path, download_path)
+                result["success"] = True
+                result["path"] = str(download_path)
+                # 通过验证后的 Cookie 交给调用方，后续请求可直接走 HTTP
+                result["cookies"] = await context.cookies()
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        # 之后完成的下载/响应回调看到 done 已结束，不再写入或自行清理
+        if not done.done():
+            done.cancel()
+        navigation.cancel()
+        await asyncio.gather(navigation, return_exceptions=True)
+        await page.close()
+        for tmp_path in tmp_paths:
+            tmp_path.unlink(missing_ok=True)
+
+    return result
 
 
 async def download_pdf_async(url: str, output_path: str) -> dict:
-    """异步下载 PDF"""
+    """异步下载 PDF（单次模式，独立启动浏览器）"""
     from playwright.async_api import async_playwright
-    
-    result = {"success": False, "error": None}
-    
+
     try:
         async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=["--no-sandbox", "--disable-setuid-sandbox"]
-            )
-            
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                viewport={"width": 1920, "height": 1080},
-                accept_downloads=True
-            )
-            
-            page = await context.new_page()
-            
-            download_path = Path(output_path)
-            actual_download_path = None
-            
-            async def handle_download(download):
-                nonlocal actual_download_path
-                actual_download_path = download_path
-                await download.save_as(actual_download_path)
-            
-            page.on("download", handle_download)
-            
+            browser, context = await _launch_browser(p)
             try:
-                await page.goto(url, wait_until="networkidle", timeout=60000)
-            except Exception:
-                pass
-            
-            await asyncio.sleep(5)
-            
-            if actual_download_path and actual_download_path.exists():
+                return await download_with_context(context, url, output_path)
+            finally:
+                await browser.close()
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def _emit(message: dict) -> None:
+    sys.stdout.write(json.dumps(message, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+async def serve() -> None:
+    """常驻模式：复用同一个浏览器上下文，反爬验证得到的 Cookie 在任务间共享"""
+    try:
+        from playwright.async_api import async_playwright
+    except Exception as e:
+        _emit({"ready": False, "error": f"Playwright导入失败: {e}"})
+        return
+
+    async with async_playwright() as p:
+        try:
+            browser, context = await _launch_browser(p)
+        except Exception as e:
+            _emit({"ready": False, "error": f"浏览器启动失败: {e}"})
+            return
+        _emit({"ready": True})
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max(1, MAX_PAGES))
+        tasks = set()
+
+        async def run_job(job: dict) -> None:
+            async with semaphore:
+                logger.info("处理下载任务: %s", job.get("url"))
                 try:
-                    with open(actual_download_path, "rb") as f:
-                        header = f.read(5)
-                    if header.startswith(b"%PDF-"):
-                        result["success"] = True
-                        result["path"] = str(actual_download_path)
-                        await browser.close()
-                        return result
+                    result = await download_with_context(context, job["url"], job["output_path"])
                 except Exception as e:
-                    result["error"] = str(e)
-            
-            await browser.close()
-    except Exception as e:
-        result["error"] = str(e)
-    
-    return result
+                    result = {"success": False, "error": str(e)}
+            result["id"] = job.get("id")
+            _emit(result)
+
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("无法解析任务: %s", line.strip())
+                continue
+            task = asyncio.create_task(run_job(job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        await browser.close()
 
 
 def main():
+    if len(sys.argv) == 2 and sys.argv[1] == "--serve":
+        asyncio.run(serve())
+        return
+
     if len(sys.argv) != 3:
-        print(json.dumps({"success": False, "error": "Usage: download_pdf_worker.py <url> <output_path>"}))
+        print(json.dumps({"success": False, "error": "Usage: download_pdf_worker.py <url> <output_path> | --serve"}))
         sys.exit(1)
-    
+
     url = sys.argv[1]
     output_path = sys.argv[2]
-    
+
     result = asyncio.run(download_pdf_async(url, output_path))
     print(json.dumps(result))
 
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""全量导入基金列表到 funds 表
+
+    python backend/scripts/import_fund_universe.py                    # 从 akshare 拉取
+    python backend/scripts/import_fund_universe.py --with-managers    # 同时补全基金经理与基金公司
+    python backend/scripts/import_fund_universe.py --file funds.csv   # 从本地 CSV/Parquet 快照导入
+    python backend/scripts/import_fund_universe.py --save funds.csv   # 拉取后另存快照，便于离线重放
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.database import bulk_upsert_funds, init_db
+from backend.services.fund_universe import (
+    load_from_akshare,
+    load_from_file,
+    normalize_funds,
+    to_rows,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全量导入基金列表")
+    parser.add_argument("--file", type=Path, help="本地 CSV/Parquet 快照路径，不指定则从 akshare 拉取")
+    parser.add_argument("--with-managers", action="store_true", help="额外拉取基金经理表（较慢）")
+    parser.add_argument("--save", type=Path, help="将清洗后的列表另存为 CSV 快照")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.file:
+        df = load_from_file(args.file)
+    else:
+        df = load_from_akshare(with_managers=args.with_managers)
+    funds = normalize_funds(df)
+    loaded = time.perf_counter()
+
+    if args.save:
+        funds.to_csv(args.save, index=False, encoding="utf-8-sig")
+        logger.info(f"已保存快照: {args.save}")
+
+    init_db()
+    result = bulk_upsert_funds(to_rows(funds))
+    done = time.perf_counter()
+    logger.info(
+        f"导入完成: 共 {result['total']} 只，新增 {result['inserted']}，更新 {result['updated']}；"
+        f"读取 {loaded - start:.1f}s，写入 {done - loaded:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
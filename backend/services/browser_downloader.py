@@ -0,0 +1,221 @@
+"""Playwright 下载：优先使用常驻浏览器进程，不可用时回落到单次 subprocess
+
+常驻进程即 download_pdf_worker.py --serve，浏览器只冷启动一次，
+之后每个被反爬验证拦截的下载只需一次页面导航。
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Dict, Optional
+
+from backend.services.http_client import import_browser_cookies
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "download_pdf_worker.py"
+DOWNLOAD_TIMEOUT = 120
+STARTUP_TIMEOUT = 60
+
+
+class _BrowserWorker:
+    """常驻下载进程的客户端：stdin 写任务，后台线程读取 stdout 的结果行"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._pid: Optional[int] = None
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count(1)
+        # 启动失败后本进程不再尝试常驻模式
+        self.disabled = False
+
+    def download(self, url: str, output_path: Path, timeout: float = DOWNLOAD_TIMEOUT) -> Optional[bool]:
+        """返回下载是否成功；常驻进程不可用时返回 None"""
+        future: Future = Future()
+        with self._lock:
+            if not self._ensure_started():
+                return None
+            pending = self._pending
+            job_id = next(self._ids)
+            pending[job_id] = future
+            job = {"id": job_id, "url": url, "output_path": str(output_path)}
+            try:
+                self._process.stdin.write(json.dumps(job, ensure_ascii=False) + "\n")
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError):
+                pending.pop(job_id, None)
+                self._reset()
+                return None
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                pending.pop(job_id, None)
+            logger.warning("常驻浏览器下载超时: %s", url)
+            return False
+        if result.get("success"):
+            logger.info(f"✓ 常驻浏览器下载成功: {result.get('path')}")
+            _share_cookies(result)
+            return True
+        if result.get("worker_exited"):
+            return None
+        logger.warning(f"常驻浏览器下载失败: {result.get('error')}")
+        return False
+
+    def close(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def _ensure_started(self) -> bool:
+        if self.disabled:
+            return False
+        if self._process is not None and self._pid == os.getpid() and self._process.poll() is None:
+            return True
+        self._process = None
+        if not WORKER_SCRIPT.exists():
+            logger.warning(f"下载工作脚本不存在: {WORKER_SCRIPT}")
+            self.disabled = True
+            return False
+        logger.info("启动常驻浏览器进程: %s --serve", WORKER_SCRIPT)
+        try:
+            process = subprocess.Popen(
+                [sys.executable, str(WORKER_SCRIPT), "--serve"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                bufsize=1,
+            )
+        except Exception as e:
+            logger.warning(f"启动常驻浏览器进程失败: {e}")
+            self.disabled = True
+            return False
+        ready = self._read_ready(process)
+        if not ready.get("ready"):
+            logger.warning(f"常驻浏览器不可用，回落到单次下载: {ready.get('error')}")
+            process.kill()
+            self.disabled = True
+            return False
+        self._process, self._pid = process, os.getpid()
+        # 每个进程使用独立的待完成任务表，旧进程退出时只影响自己的任务
+        self._pending = {}
+        threading.Thread(
+            target=self._read_results, args=(process, self._pending), daemon=True
+        ).start()
+        return True
+
+    @staticmethod
+    def _read_ready(process: subprocess.Popen) -> dict:
+        holder: Dict[str, dict] = {}
+
+        def read():
+            line = process.stdout.readline()
+            try:
+                holder["message"] = json.loads(line) if line else {"error": "进程已退出"}
+            except json.JSONDecodeError:
+                holder["message"] = {"error": f"无法解析输出: {line.strip()}"}
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        reader.join(STARTUP_TIMEOUT)
+        return holder.get("message", {"error": "启动超时"})
+
+    def _read_results(self, process: subprocess.Popen, pending: Dict[int, Future]) -> None:
+        for line in process.stdout:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            with self._lock:
+                future = pending.pop(result.get("id"), None)
+            if future is not None:
+                future.set_result(result)
+        # 进程退出：未完成的任务交给调用方回落
+        with self._lock:
+            if self._process is process:
+                self._process = None
+            futures = list(pending.values())
+            pending.clear()
+        for future in futures:
+            future.set_result({"success": False, "worker_exited": True})
+
+    def _reset(self) -> None:
+        process, self._process = self._process, None
+        if process is None or self._pid != os.getpid():
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=10)
+        except Exception:
+            process.kill()
+
+
+_worker = _BrowserWorker()
+atexit.register(_worker.close)
+
+
+def _share_cookies(result: dict) -> None:
+    """浏览器通过反爬验证后，把 Cookie 共享给 requests 会话，后续下载直接走 HTTP"""
+    try:
+        import_browser_cookies(result.get("cookies") or [])
+    except Exception as e:
+        logger.warning(f"导入浏览器Cookie失败: {e}")
+
+
+def download_pdf(url: str, output_path: Path) -> bool:
+    """使用 Playwright 下载 PDF（处理反爬虫）"""
+    result = _worker.download(url, output_path)
+    if result is not None:
+        return result
+    return _download_oneshot(url, output_path)
+
+
+def _download_oneshot(url: str, output_path: Path) -> bool:
+    """单次模式：每次启动独立的下载脚本"""
+    if not WORKER_SCRIPT.exists():
+        logger.warning(f"下载工作脚本不存在: {WORKER_SCRIPT}")
+        return False
+
+    try:
+        logger.info(f"通过 subprocess 调用下载脚本: {WORKER_SCRIPT}")
+
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(WORKER_SCRIPT),
+                url,
+                str(output_path)
+            ],
+            capture_output=True,
+            text=True,
+            timeout=DOWNLOAD_TIMEOUT
+        )
+
+        if result.returncode == 0:
+            try:
+                data = json.loads(result.stdout)
+                if data.get("success"):
+                    logger.info(f"✓ subprocess 下载成功: {data.get('path')}")
+                    _share_cookies(data)
+                    return True
+                else:
+                    logger.warning(f"subprocess 下载失败: {data.get('error')}")
+            except json.JSONDecodeError:
+                logger.warning(f"解析 subprocess 输出失败: {result.stdout}")
+        else:
+            logger.warning(f"subprocess 执行失败: {result.stderr}")
+
+    except subprocess.TimeoutExpired:
+        logger.warning("subprocess 下载超时")
+    except Exception as e:
+        logger.warning(f"subprocess 调用失败: {e}")
+
+    return False
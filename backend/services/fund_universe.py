@@ -0,0 +1,102 @@
+"""全量基金列表导入
+
+一次性读取整张基金列表（akshare 的 fund_name_em 或本地 CSV/Parquet 快照），
+用 DataFrame 列操作完成字段映射与清洗，再通过 bulk_upsert_funds 在单个事务中写入。
+相比 batch_import_funds 逐只调用接口，全量导入只需一次网络请求。
+"""
+
+import logging
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from backend.database import FUND_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 源数据列名 -> funds 表列名，同时兼容 akshare 中文列名与英文列名的快照
+COLUMN_MAPPING = {
+    "基金代码": "code",
+    "基金简称": "name",
+    "基金名称": "name",
+    "基金全称": "full_name",
+    "基金经理": "manager",
+    "基金类型": "fund_type",
+    "基金公司": "fund_company",
+    "基金管理人": "fund_company",
+    "成立时间": "establish_date",
+    "成立日期": "establish_date",
+    "最新规模": "latest_scale",
+    "托管银行": "custodian_bank",
+    "业绩比较基准": "benchmark",
+}
+
+
+def load_from_akshare(with_managers: bool = False) -> pd.DataFrame:
+    """从 akshare 拉取全部公募基金列表；with_managers 时额外拉取基金经理表补全经理与基金公司"""
+    import akshare as ak
+
+    df = ak.fund_name_em()
+    logger.info(f"akshare 基金列表: {len(df)} 行")
+    if with_managers:
+        managers = _load_managers(ak)
+        if managers is not None:
+            df = normalize_funds(df).merge(managers, on="code", how="left", suffixes=("", "_manager"))
+            for col in ("manager", "fund_company"):
+                df[col] = df[col].fillna(df.pop(f"{col}_manager"))
+    return df
+
+
+def _load_managers(ak) -> Optional[pd.DataFrame]:
+    """基金经理表按基金代码聚合，返回 code、manager、fund_company 三列"""
+    try:
+        df = ak.fund_manager_em()
+    except Exception as e:
+        logger.warning(f"获取基金经理列表失败，跳过: {e}")
+        return None
+    required = {"姓名", "所属公司", "现任基金代码"}
+    if not required.issubset(df.columns):
+        logger.warning(f"基金经理列表缺少列 {required - set(df.columns)}，跳过")
+        return None
+    df = df.assign(code=df["现任基金代码"].astype(str).str.split(",")).explode("code")
+    df["code"] = df["code"].str.strip()
+    df = df.drop_duplicates(["code", "姓名"])
+    return df.groupby("code", sort=False).agg(
+        manager=("姓名", "、".join), fund_company=("所属公司", "first")
+    ).reset_index()
+
+
+def load_from_file(path: Path) -> pd.DataFrame:
+    """读取本地快照，支持 .csv 与 .parquet；代码列按字符串读取以保留前导零"""
+    path = Path(path)
+    if path.suffix.lower() == ".parquet":
+        try:
+            return pd.read_parquet(path)
+        except ImportError as e:
+            raise RuntimeError(f"读取 Parquet 需要安装 pyarrow: {e}") from e
+    return pd.read_csv(path, dtype=str, encoding="utf-8-sig")
+
+
+def normalize_funds(df: pd.DataFrame) -> pd.DataFrame:
+    """映射列名并清洗：代码补齐为 6 位、去掉无效代码与重复行，缺失值统一为 None"""
+    df = df.rename(columns={src: dst for src, dst in COLUMN_MAPPING.items() if src in df.columns})
+    # 同一目标列可能来自多个源列（如 基金简称/基金名称），保留第一个
+    df = df.loc[:, ~df.columns.duplicated()]
+    if "code" not in df.columns or "name" not in df.columns:
+        raise ValueError(f"基金列表缺少代码或名称列: {list(df.columns)}")
+
+    df = df.reindex(columns=FUND_COLUMNS)
+    text = df.astype("string").apply(lambda col: col.str.strip())
+    text["code"] = text["code"].str.zfill(6)
+    valid = text["code"].str.fullmatch(r"\d{6}", na=False) & text["name"].fillna("").ne("")
+    dropped = int((~valid).sum())
+    if dropped:
+        logger.info(f"跳过无效行 {dropped} 行")
+    text = text[valid].drop_duplicates("code", keep="first").replace("", pd.NA).astype(object)
+    return text.where(text.notna(), None)
+
+
+def to_rows(df: pd.DataFrame) -> List[Tuple]:
+    """按 FUND_COLUMNS 顺序转换为元组，供 executemany 使用"""
+    return list(df[list(FUND_COLUMNS)].itertuples(index=False, name=None))
@@ -0,0 +1,185 @@
+"""进程内共享的 HTTP 连接池与按主机限速
+
+所有季报、PDF 下载共用同一个 requests.Session，批量拉取时复用 TCP/TLS 连接。
+连接池大小与重试策略可通过环境变量调整：
+HTTP_POOL_SIZE（默认 16）、HTTP_MAX_RETRIES（默认 3）、HTTP_RETRY_BACKOFF（默认 0.5 秒）。
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.cookies import create_cookie
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# 模拟浏览器的默认请求头，作为共享会话的默认值；
+# User-Agent 需与 download_pdf_worker.py 保持一致，浏览器导出的验证 Cookie 才能复用
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Cache-Control": "max-age=0",
+}
+
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# 各数据源主机，用于按主机限速；akshare 的请求不经过共享会话，调用前按这些主机名限速
+XUEQIU_HOST = "danjuanfunds.com"
+EASTMONEY_HOST = "fund.eastmoney.com"
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+_pool_size: Optional[int] = None
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.environ.get(name, default)))
+    except ValueError:
+        logger.warning("环境变量 %s 不是整数，使用默认值 %s", name, default)
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.environ.get(name, default)))
+    except ValueError:
+        logger.warning("环境变量 %s 不是数字，使用默认值 %s", name, default)
+        return default
+
+
+def _build_adapter(pool_size: int) -> HTTPAdapter:
+    retries = _env_int("HTTP_MAX_RETRIES", 3)
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=_env_float("HTTP_RETRY_BACKOFF", 0.5),
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        # 重试耗尽后返回最后一次响应，由调用方 raise_for_status
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+
+def _mount_adapters(session: requests.Session, pool_size: int) -> None:
+    for prefix in ("https://", "http://"):
+        old = session.adapters.get(prefix)
+        session.mount(prefix, _build_adapter(pool_size))
+        if old is not None:
+            old.close()
+
+
+def get_session() -> requests.Session:
+    """返回进程内共享的会话；fork 出的子进程会重新创建，不复用父进程的连接"""
+    global _session, _session_pid, _pool_size
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            if _pool_size is None:
+                _pool_size = max(1, _env_int("HTTP_POOL_SIZE", 16))
+            session = requests.Session()
+            session.headers.update(BROWSER_HEADERS)
+            _mount_adapters(session, _pool_size)
+            _session, _session_pid = session, pid
+    return _session
+
+
+def set_pool_size(pool_size: int) -> None:
+    """调整每个主机的连接池大小，并发线程数超过连接池时应先调大"""
+    global _pool_size
+    with _session_lock:
+        _pool_size = max(1, pool_size)
+        if _session is not None and _session_pid == os.getpid():
+            _mount_adapters(_session, _pool_size)
+
+
+def import_browser_cookies(cookies: List[Dict]) -> int:
+    """把 Playwright 导出的 Cookie 写入共享会话，返回导入数量
+
+    过期时间随 Cookie 一起保存，过期后 cookiejar 不再发送，下一次遇到
+    反爬验证时重新走浏览器获取。会话 Cookie（expires 为 -1）随进程结束失效。
+    """
+    session = get_session()
+    now = time.time()
+    imported = 0
+    for item in cookies:
+        name, value = item.get("name"), item.get("value")
+        if not name or value is None:
+            continue
+        expires = item.get("expires")
+        expires = int(expires) if expires and expires > 0 else None
+        if expires is not None and expires <= now:
+            continue
+        session.cookies.set_cookie(
+            create_cookie(
+                name,
+                value,
+                domain=item.get("domain", ""),
+                path=item.get("path") or "/",
+                expires=expires,
+                secure=bool(item.get("secure")),
+                rest={"HttpOnly": None} if item.get("httpOnly") else {},
+            )
+        )
+        imported += 1
+    session.cookies.clear_expired_cookies()
+    if imported:
+        logger.info("导入浏览器Cookie %s 个", imported)
+    return imported
+
+
+class _HostRateLimiter:
+    """按主机限速：同一主机相邻两次请求的间隔不少于 min_interval 秒"""
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, host: str, min_interval: float = 0.0) -> None:
+        interval = max(self.min_interval, min_interval)
+        if interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_rate_limiter = _HostRateLimiter()
+
+
+def set_host_rate_limit(min_interval: float) -> None:
+    """设置每个主机的最小请求间隔（秒），0 表示不限速"""
+    _rate_limiter.min_interval = max(0.0, min_interval)
+
+
+def throttle(url_or_host: str, min_interval: float = 0.0) -> None:
+    """按 URL 或主机名等待限速槽位
+
+    min_interval 为本次调用方要求的最小间隔，只会在全局设置的基础上放慢，不会覆盖它。
+    """
+    host = urlparse(url_or_host).hostname if "://" in url_or_host else url_or_host
+    _rate_limiter.wait(host or url_or_host, min_interval)
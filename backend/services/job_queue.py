@@ -0,0 +1,177 @@
+"""持久化在 SQLite 中的后台任务队列
+
+任务写入 jobs 表，worker 协程领取任务时加租约并定期心跳续租；
+进程崩溃或重启后，租约过期的任务会被回收重新排队。失败的任务按指数退避重试，
+超过最大次数后标记为失败。同一去重键同时只允许一个任务在排队或运行。
+worker 协程中的数据库操作都放到线程中执行，避免占住事件循环；
+find/is_full/submit/position 等公开方法是同步的数据库调用，
+应在线程中调用（如 FastAPI 的同步接口），不要直接在事件循环中调用。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from backend.database import (
+    claim_job,
+    complete_job,
+    count_queued_jobs,
+    enqueue_job,
+    fail_job,
+    find_active_job,
+    get_job_position,
+    heartbeat_job,
+    reclaim_expired_jobs,
+)
+
+logger = logging.getLogger(__name__)
+
+# 重试退避上限（秒）
+MAX_RETRY_DELAY = 600
+
+
+class JobQueue:
+    def __init__(
+        self,
+        kind: str,
+        handler: Callable[..., Awaitable[Any]],
+        concurrency: int = 2,
+        max_size: int = 100,
+        lease_seconds: float = 60,
+        max_attempts: int = 3,
+        retry_delay: float = 30,
+        poll_interval: float = 2,
+        on_failure: Optional[Callable[[List[Any], str, bool], None]] = None,
+    ):
+        """handler(*payload) 执行任务，抛出异常视为失败；
+        on_failure(payload, error, will_retry) 在失败或租约被回收时调用（在线程中执行）
+        """
+        self.kind = kind
+        self._handler = handler
+        self._concurrency = max(1, concurrency)
+        self._max_size = max(1, max_size)
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max(1, max_attempts)
+        self._retry_delay = retry_delay
+        self._poll_interval = poll_interval
+        self._on_failure = on_failure
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """在事件循环中启动 worker，需在应用启动后调用"""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self._concurrency)
+        ]
+        logger.info(
+            "任务队列 %s 已启动: owner=%s 并发 %s 容量 %s",
+            self.kind,
+            self._owner,
+            self._concurrency,
+            self._max_size,
+        )
+
+    async def stop(self) -> None:
+        """停止 worker；运行中的任务不再续租，租约到期后由其他进程或下次启动回收"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def find(self, key: str) -> Optional[Dict[str, Any]]:
+        """返回该去重键正在排队或运行的任务"""
+        return find_active_job(self.kind, key)
+
+    def is_full(self) -> bool:
+        return count_queued_jobs(self.kind) >= self._max_size
+
+    def submit(self, key: str, payload: List[Any]) -> bool:
+        """提交任务；同一去重键已有活动任务时返回 False"""
+        job_id = enqueue_job(self.kind, key, payload, self._max_attempts)
+        if job_id is None:
+            return False
+        if self._loop is not None and not self._loop.is_closed():
+            # 可能在线程中调用，唤醒 worker 需切回事件循环
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def position(self, key: str) -> Optional[int]:
+        """运行中返回 0，排队中返回从 1 开始的位置，没有活动任务返回 None"""
+        return get_job_position(self.kind, key)
+
+    def reclaim_expired(self) -> int:
+        """回收租约过期的任务，返回回收数量"""
+        reclaimed = reclaim_expired_jobs(self.kind)
+        for job in reclaimed:
+            will_retry = job["status"] == "queued"
+            logger.warning(
+                "回收过期任务: %s id=%s attempts=%s %s",
+                self.kind,
+                job["id"],
+                job["attempts"],
+                "重新排队" if will_retry else "已达最大次数",
+            )
+            self._notify_failure(job["payload"], job["last_error"], will_retry)
+        return len(reclaimed)
+
+    def _notify_failure(self, payload: List[Any], error: str, will_retry: bool) -> None:
+        if self._on_failure is None:
+            return
+        try:
+            self._on_failure(payload, error, will_retry)
+        except Exception:
+            logger.exception("任务失败回调异常: %s", self.kind)
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            if index == 0:
+                await asyncio.to_thread(self.reclaim_expired)
+            job = await asyncio.to_thread(claim_job, self.kind, self._owner, self._lease_seconds)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            await self._handler(*job["payload"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            delay = min(self._retry_delay * 2 ** (job["attempts"] - 1), MAX_RETRY_DELAY)
+            will_retry = await asyncio.to_thread(fail_job, job["id"], self._owner, str(exc), delay)
+            logger.warning(
+                "任务失败: %s id=%s attempts=%s/%s %s",
+                self.kind,
+                job["id"],
+                job["attempts"],
+                job["max_attempts"],
+                f"{delay:.0f}s 后重试" if will_retry else "不再重试",
+            )
+            await asyncio.to_thread(self._notify_failure, job["payload"], str(exc), will_retry)
+        else:
+            await asyncio.to_thread(complete_job, job["id"], self._owner)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self._lease_seconds / 3)
+            alive = await asyncio.to_thread(heartbeat_job, job_id, self._owner, self._lease_seconds)
+            if not alive:
+                logger.warning("任务租约已丢失: %s id=%s", self.kind, job_id)
+                return
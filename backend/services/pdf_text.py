@@ -0,0 +1,260 @@
+"""PDF 文本提取后端
+
+默认优先使用 pypdfium2 的纯文本提取（不做版面分析，速度快），
+结果为空或疑似乱码时回落到 pdfplumber。可通过环境变量
+PDF_TEXT_BACKEND 固定后端：auto（默认）/ pdfium / pdfplumber。
+"""
+
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKEND_AUTO = "auto"
+BACKEND_PDFIUM = "pdfium"
+BACKEND_PDFPLUMBER = "pdfplumber"
+
+# §4 管理人报告章节的定位规则，目录行（以页码结尾）不匹配
+_SECTION4_HEADING = re.compile(r"^\s*(?:§\s*4|第四节)\s*管理人报告\s*$", re.MULTILINE)
+_SECTION5_HEADING = re.compile(r"^\s*(?:§\s*5|第五节)", re.MULTILINE)
+_SECTION4_OUTLINE_TITLE = re.compile(r"管理人报告")
+_VIEWPOINT_SECTION_KEYWORD = "投资策略和运作分析"
+
+_CJK_CHAR = re.compile(r"[\u4e00-\u9fff]")
+_GARBLED_CHAR = re.compile(r"[\ufffd\ue000-\uf8ff]|\(cid:\d+\)")
+
+# pdfium 不是线程安全的，同一进程内串行访问
+_PDFIUM_LOCK = threading.Lock()
+
+
+class _PdfplumberDocument:
+    name = BACKEND_PDFPLUMBER
+
+    def __init__(self, pdf_path: Path):
+        import pdfplumber
+
+        self._pdf = pdfplumber.open(str(pdf_path))
+        self.page_count = len(self._pdf.pages)
+
+    def page_text(self, index: int) -> str:
+        return self._pdf.pages[index].extract_text() or ""
+
+    def page_text_fast(self, index: int) -> str:
+        """不做版面分析的快速提取，仅用于章节定位"""
+        page = self._pdf.pages[index]
+        extract = getattr(page, "extract_text_simple", None) or page.extract_text
+        return extract() or ""
+
+    def outline(self) -> List[Tuple[int, str, int]]:
+        try:
+            outlines = list(self._pdf.doc.get_outlines())
+        except Exception:
+            return []
+        page_index = {page.page_obj.pageid: i for i, page in enumerate(self._pdf.pages)}
+        entries = []
+        for level, title, dest, action, _ in outlines:
+            index = _resolve_outline_page(self._pdf.doc, dest, action, page_index)
+            if index is not None:
+                entries.append((level, title or "", index))
+        return entries
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class _PdfiumDocument:
+    name = BACKEND_PDFIUM
+
+    def __init__(self, pdf_path: Path):
+        import pypdfium2
+
+        _PDFIUM_LOCK.acquire()
+        try:
+            self._pdf = pypdfium2.PdfDocument(str(pdf_path))
+        except Exception:
+            _PDFIUM_LOCK.release()
+            raise
+        self.page_count = len(self._pdf)
+        self._texts: Dict[int, str] = {}
+
+    def page_text(self, index: int) -> str:
+        if index not in self._texts:
+            page = self._pdf[index]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+            self._texts[index] = text.replace("\r\n", "\n").replace("\r", "\n")
+        return self._texts[index]
+
+    # 纯文本提取本身已足够快，定位与正文提取共用同一份结果
+    page_text_fast = page_text
+
+    def outline(self) -> List[Tuple[int, str, int]]:
+        entries = []
+        try:
+            for item in self._pdf.get_toc():
+                title = item.get_title() if hasattr(item, "get_title") else item.title
+                if hasattr(item, "get_dest"):
+                    dest = item.get_dest()
+                    index = dest.get_index() if dest else None
+                else:
+                    index = item.page_index
+                if index is not None:
+                    entries.append((item.level, title or "", index))
+        except Exception:
+            return []
+        return entries
+
+    def close(self) -> None:
+        try:
+            self._pdf.close()
+        finally:
+            _PDFIUM_LOCK.release()
+
+
+_BACKENDS = {
+    BACKEND_PDFIUM: _PdfiumDocument,
+    BACKEND_PDFPLUMBER: _PdfplumberDocument,
+}
+
+
+def get_backend_setting() -> str:
+    backend = os.environ.get("PDF_TEXT_BACKEND", BACKEND_AUTO).strip().lower()
+    if backend != BACKEND_AUTO and backend not in _BACKENDS:
+        logger.warning("未知的PDF文本后端 %s，使用 auto", backend)
+        return BACKEND_AUTO
+    return backend
+
+
+def extract_pdf_text(
+    pdf_path: Path, targeted: bool = True, backend: Optional[str] = None
+) -> Optional[str]:
+    """提取PDF文本
+
+    targeted 为 True 时先定位 §4 管理人报告所在页，只提取这些页的文本；
+    定位失败或目标页中没有观点章节时回落到全文提取。
+    backend 为 None 时读取 PDF_TEXT_BACKEND 设置。
+    """
+    backend = backend or get_backend_setting()
+    if backend != BACKEND_AUTO:
+        return _extract_with_backend(backend, pdf_path, targeted)
+
+    text = _extract_with_backend(BACKEND_PDFIUM, pdf_path, targeted)
+    if text and not _looks_garbled(text):
+        return text
+    logger.info("快速文本提取为空或疑似乱码，回落到 pdfplumber: %s", pdf_path)
+    return _extract_with_backend(BACKEND_PDFPLUMBER, pdf_path, targeted)
+
+
+def _extract_with_backend(backend: str, pdf_path: Path, targeted: bool) -> Optional[str]:
+    try:
+        document = _BACKENDS[backend](pdf_path)
+    except ImportError:
+        logger.warning("PDF文本后端 %s 未安装或导入失败", backend)
+        return None
+    except Exception:
+        logger.exception("PDF解析异常: %s", pdf_path)
+        return None
+    try:
+        if targeted:
+            page_range = _locate_management_report_pages(document)
+            if page_range:
+                start, end = page_range
+                text = _join_pages(document, range(start, end + 1))
+                if _VIEWPOINT_SECTION_KEYWORD in text:
+                    logger.info(
+                        "定位到管理人报告: 第%s-%s页 (共%s页, %s)",
+                        start + 1,
+                        end + 1,
+                        document.page_count,
+                        document.name,
+                    )
+                    return text
+            logger.info("未定位到管理人报告章节，回落到全文解析: %s", pdf_path)
+        text = _join_pages(document, range(document.page_count))
+    except Exception:
+        logger.exception("PDF解析异常: %s", pdf_path)
+        return None
+    finally:
+        document.close()
+    return text if text.strip() else None
+
+
+def _join_pages(document, indexes) -> str:
+    pages = [document.page_text(i) for i in indexes]
+    return "\n".join([page for page in pages if page])
+
+
+def _looks_garbled(text: str) -> bool:
+    """替换字符、私有区字符或 (cid:N) 占比过高，或较长文本中没有任何汉字"""
+    garbled = sum(len(m) for m in _GARBLED_CHAR.findall(text))
+    if garbled > len(text) * 0.05:
+        return True
+    return len(text) > 200 and not _CJK_CHAR.search(text)
+
+
+def _locate_management_report_pages(document) -> Optional[Tuple[int, int]]:
+    """返回 §4 管理人报告的页码范围 (起始页, 结束页)，均为从 0 开始的闭区间"""
+    return _locate_section_by_outline(document) or _locate_section_by_scan(document)
+
+
+def _locate_section_by_outline(document) -> Optional[Tuple[int, int]]:
+    """通过PDF书签定位，完全不需要解析页面内容"""
+    entries = document.outline()
+    for i, (level, title, start) in enumerate(entries):
+        if _SECTION4_OUTLINE_TITLE.search(title):
+            end = next(
+                (index for lv, _, index in entries[i + 1 :] if lv <= level),
+                document.page_count - 1,
+            )
+            return start, max(start, end)
+    return None
+
+
+def _locate_section_by_scan(document) -> Optional[Tuple[int, int]]:
+    """逐页快速提取文本，遇到 §5 即停止扫描"""
+    start = None
+    for i in range(document.page_count):
+        text = document.page_text_fast(i)
+        if start is None:
+            match = _SECTION4_HEADING.search(text)
+            if match:
+                start = i
+                # §4 与 §5 可能在同一页
+                if _SECTION5_HEADING.search(text, match.end()):
+                    return start, i
+        elif _SECTION5_HEADING.search(text):
+            return start, i
+    if start is None:
+        return None
+    return start, document.page_count - 1
+
+
+def _resolve_outline_page(doc, dest, action, page_index: Dict[int, int]) -> Optional[int]:
+    from pdfminer.pdftypes import resolve1
+    from pdfminer.psparser import PSLiteral
+
+    try:
+        if dest is None and action:
+            action = resolve1(action)
+            if isinstance(action, dict):
+                dest = action.get("D")
+        dest = resolve1(dest)
+        if isinstance(dest, (str, bytes, PSLiteral)):
+            name = dest.name if isinstance(dest, PSLiteral) else dest
+            dest = resolve1(doc.get_dest(name))
+        if isinstance(dest, dict):
+            dest = resolve1(dest.get("D"))
+        if isinstance(dest, list) and dest:
+            return page_index.get(getattr(dest[0], "objid", None))
+    except Exception:
+        return None
+    return None
+
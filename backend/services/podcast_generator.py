@@ -0,0 +1,138 @@
+"""播客生成任务：观点提取、对话生成、语音合成
+
+API 进程与独立 worker 进程（python -m backend.worker）共用这里的任务处理函数，
+两者通过数据库中的 jobs 表交接任务。
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Tuple
+
+from backend.database import (
+    get_cached_viewpoint,
+    list_unfinished_podcasts,
+    save_cached_viewpoint,
+    update_podcast,
+)
+from backend.services.ai_service import generate_dialogue_segments
+from backend.services.job_queue import JobQueue
+from backend.services.report_async import get_report_viewpoint_async
+from backend.services.report_parser import REPORT_EXTRACTOR_VERSION
+from backend.services.tts_service import synthesize_dialogue
+
+logger = logging.getLogger(__name__)
+
+AUDIO_DIR = Path(__file__).resolve().parents[1] / "audio"
+# 播客生成并发数与排队上限
+PODCAST_WORKERS = int(os.environ.get("PODCAST_WORKERS", "2"))
+PODCAST_QUEUE_SIZE = int(os.environ.get("PODCAST_QUEUE_SIZE", "100"))
+# 失败后最多尝试次数（含首次）
+PODCAST_MAX_ATTEMPTS = int(os.environ.get("PODCAST_MAX_ATTEMPTS", "3"))
+
+
+async def load_report_viewpoint(fund_code: str, report_period: str) -> Tuple[str, Dict]:
+    """优先读取观点缓存，未命中时解析季报并写回缓存；阻塞操作都在执行器中完成"""
+    cached = await asyncio.to_thread(
+        get_cached_viewpoint, fund_code, report_period, REPORT_EXTRACTOR_VERSION
+    )
+    if cached:
+        logger.info(f"命中观点缓存: {fund_code} {report_period}")
+        return cached["viewpoint"], cached["fund_info"]
+    viewpoint, fund_info, pdf_hash = await get_report_viewpoint_async(fund_code, report_period)
+    if viewpoint and pdf_hash:
+        await asyncio.to_thread(
+            save_cached_viewpoint,
+            fund_code,
+            report_period,
+            viewpoint,
+            fund_info,
+            REPORT_EXTRACTOR_VERSION,
+            pdf_hash,
+        )
+    return viewpoint, fund_info
+
+
+async def do_generate(task_id: int, fund_code: str, report_period: str):
+    logger.info(f"开始生成播客: task_id={task_id}, fund_code={fund_code}, report_period={report_period}")
+    try:
+        await asyncio.to_thread(update_podcast, task_id, {"status": "generating"})
+        logger.info(f"更新状态为 generating: task_id={task_id}")
+        viewpoint, fund_info = await load_report_viewpoint(fund_code, report_period)
+        logger.info(f"获取观点完成: has_viewpoint={bool(viewpoint)}, fund_name={fund_info.get('name')}")
+        if not viewpoint:
+            raise ValueError("未能提取观点")
+        segments = await asyncio.to_thread(
+            generate_dialogue_segments,
+            fund_name=fund_info["name"],
+            manager=fund_info["manager"],
+            report_period=report_period,
+            viewpoint=viewpoint,
+        )
+        logger.info(f"生成对话段完成: segments_count={len(segments)}")
+        audio_filename = f"{fund_code}_{report_period}_{int(datetime.utcnow().timestamp())}.mp3"
+        AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+        audio_path = AUDIO_DIR / audio_filename
+        logger.info(f"开始合成音频: path={audio_path}")
+        # 合成中的音频合并（pydub/ffmpeg）是阻塞的，整体放到线程中的独立事件循环执行
+        tts_result = await asyncio.to_thread(
+            asyncio.run, synthesize_dialogue(segments, str(audio_path))
+        )
+        logger.info(f"音频合成完成: result={bool(tts_result)}")
+        if not tts_result:
+            raise ValueError("音频生成失败")
+        audio_url = f"/audio/{audio_filename}"
+        await asyncio.to_thread(
+            update_podcast,
+            task_id,
+            {
+                "status": "completed",
+                "audio_url": audio_url,
+                "duration": tts_result["duration"],
+                "transcript": tts_result["transcript"],
+                "title": f"{fund_info['name']} {report_period} 季报解读",
+            },
+        )
+        logger.info(f"播客生成完成: task_id={task_id}, audio_url={audio_url}")
+    except Exception as exc:
+        logger.error(f"播客生成失败: task_id={task_id}, error={str(exc)}", exc_info=True)
+        # 状态由任务队列的失败回调更新：还会重试时回到 pending，否则为 failed
+        raise
+
+
+def podcast_job_key(fund_code: str, report_period: str) -> str:
+    return f"{fund_code}:{report_period}"
+
+
+def on_podcast_job_failure(payload: list, error: str, will_retry: bool) -> None:
+    task_id = payload[0]
+    if will_retry:
+        update_podcast(task_id, {"status": "pending", "error_msg": f"{error}（等待重试）"})
+    else:
+        update_podcast(task_id, {"status": "failed", "error_msg": error})
+
+
+def create_podcast_queue(concurrency: int = PODCAST_WORKERS) -> JobQueue:
+    return JobQueue(
+        "podcast",
+        do_generate,
+        concurrency=concurrency,
+        max_size=PODCAST_QUEUE_SIZE,
+        max_attempts=PODCAST_MAX_ATTEMPTS,
+        on_failure=on_podcast_job_failure,
+    )
+
+
+def requeue_unfinished_podcasts(jobs: JobQueue) -> int:
+    """停留在 pending/generating 且没有活动任务的播客重新入队，返回入队数量"""
+    requeued = 0
+    for podcast in list_unfinished_podcasts():
+        if jobs.submit(
+            podcast_job_key(podcast["fund_code"], podcast["report_period"]),
+            [podcast["id"], podcast["fund_code"], podcast["report_period"]],
+        ):
+            logger.info(f"恢复未完成的播客任务: id={podcast['id']}")
+            requeued += 1
+    return requeued
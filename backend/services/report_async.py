@@ -0,0 +1,107 @@
+"""FastAPI 使用的异步观点提取入口
+
+网络阶段（akshare 查询、PDF 下载、Playwright 子进程）在 I/O 线程池执行，
+PDF 解析与观点提取在进程池执行，事件循环只等待结果，不被阻塞。
+akshare 只提供同步接口，下载也依赖共享的 requests 会话（连接池、重试、验证 Cookie），
+因此不另引入异步 HTTP 客户端，而是把同步阶段整体放到执行器中。
+线程数与进程数可通过 REPORT_IO_WORKERS（默认 8）、REPORT_CPU_WORKERS（默认 2）调整。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+from backend.services.report_parser import (
+    _fetch_report_source_with_hash,
+    _parse_report_viewpoint,
+)
+
+logger = logging.getLogger(__name__)
+
+_executor_lock = threading.Lock()
+_io_executor: Optional[ThreadPoolExecutor] = None
+_cpu_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    with _executor_lock:
+        if _io_executor is None:
+            _io_executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("REPORT_IO_WORKERS", "8")),
+                thread_name_prefix="report-io",
+            )
+        return _io_executor
+
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    global _cpu_executor
+    with _executor_lock:
+        if _cpu_executor is None:
+            # 服务进程中有其他线程在运行，fork 可能继承被占用的锁，统一使用 spawn
+            _cpu_executor = ProcessPoolExecutor(
+                max_workers=int(os.environ.get("REPORT_CPU_WORKERS", "2")),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _cpu_executor
+
+
+def shutdown_executors() -> None:
+    global _io_executor, _cpu_executor
+    with _executor_lock:
+        io_executor, _io_executor = _io_executor, None
+        cpu_executor, _cpu_executor = _cpu_executor, None
+    if io_executor is not None:
+        io_executor.shutdown(wait=False, cancel_futures=True)
+    if cpu_executor is not None:
+        cpu_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _discard_cpu_executor(executor: ProcessPoolExecutor) -> None:
+    global _cpu_executor
+    with _executor_lock:
+        if _cpu_executor is executor:
+            _cpu_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def get_report_viewpoint_async(
+    fund_code: str, report_period: str
+) -> Tuple[str, Dict, Optional[str]]:
+    """get_report_viewpoint_with_source 的异步版本，返回值相同"""
+    loop = asyncio.get_running_loop()
+    fund, pdf_path, pdf_hash, exact = await loop.run_in_executor(
+        get_io_executor(), _fetch_report_source_with_hash, fund_code, report_period
+    )
+    viewpoint = await _parse_viewpoint(loop, fund_code, pdf_path, pdf_hash)
+    return viewpoint, fund, pdf_hash if exact else None
+
+
+async def _parse_viewpoint(
+    loop: asyncio.AbstractEventLoop,
+    fund_code: str,
+    pdf_path: Optional[str],
+    pdf_hash: Optional[str],
+) -> str:
+    if not pdf_path:
+        # 只剩内置样例文本，不值得跨进程
+        return await loop.run_in_executor(
+            get_io_executor(), _parse_report_viewpoint, fund_code, None, None
+        )
+    executor = get_cpu_executor()
+    try:
+        return await loop.run_in_executor(
+            executor, _parse_report_viewpoint, fund_code, pdf_path, pdf_hash
+        )
+    except BrokenProcessPool:
+        # 子进程异常退出（如内存不足被杀），丢弃进程池，本次在线程中解析
+        logger.warning("解析进程池已损坏，改为线程内解析: %s", fund_code)
+        _discard_cpu_executor(executor)
+        return await loop.run_in_executor(
+            get_io_executor(), _parse_report_viewpoint, fund_code, pdf_path, pdf_hash
+        )
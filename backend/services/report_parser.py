@@ -1,18 +1,74 @@
+import gzip
+import hashlib
+import json
 import logging
+import os
 import re
-import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Tuple
-
-import requests
+from typing import Dict, List, Optional, Tuple
 
 # get_fund_by_code 替换为 akshare 获取
 from fund_report_parser import extract_manager_viewpoint, parse_pdf_content
 
+from backend.database import (
+    find_quarter_announcement,
+    is_announcement_index_fresh,
+    upsert_announcements,
+)
+from backend.services.browser_downloader import download_pdf as download_pdf_with_browser
+from backend.services.http_client import EASTMONEY_HOST, XUEQIU_HOST, get_session, throttle
+from backend.services.pdf_text import extract_pdf_text, get_backend_setting
+
 
 logger = logging.getLogger(__name__)
 
+# PDF 文本提取逻辑变更时递增，旧版本的文本缓存会自动失效
+PDF_TEXT_EXTRACTOR_VERSION = 3
+# 观点提取逻辑（fund_report_parser）变更时递增
+VIEWPOINT_EXTRACTOR_VERSION = 1
+# 当前进程使用的 PDF 文本后端设置（PDF_TEXT_BACKEND），不同后端的文本与观点分开缓存
+PDF_TEXT_BACKEND = get_backend_setting()
+# 观点结果缓存使用的整体版本号
+REPORT_EXTRACTOR_VERSION = (
+    f"{PDF_TEXT_EXTRACTOR_VERSION}.{VIEWPOINT_EXTRACTOR_VERSION}-{PDF_TEXT_BACKEND}"
+)
+TEXT_CACHE_DIR = Path(__file__).resolve().parents[1] / "data" / "text_cache"
+REPORTS_DIR = Path(__file__).resolve().parents[1] / "data" / "reports"
+# 每个基金目录下的季报清单：报告期 -> PDF 文件名，以及最近一次的基金信息
+MANIFEST_NAME = "manifest.json"
+# 清单登记规则变更时递增，旧版本清单中的报告期登记作废
+MANIFEST_VERSION = 2
+# 公告标题解析不出报告期时的PDF文件名前缀
+UNKNOWN_PERIOD_PREFIX = "unknown"
+
+# PDF 流式下载：分块大小、单个PDF大小上限、非PDF响应（反爬页/跳转页）读取上限
+PDF_CHUNK_SIZE = 64 * 1024
+PDF_MAX_BYTES = int(float(os.environ.get("PDF_MAX_DOWNLOAD_MB", "50")) * 1024 * 1024)
+PDF_HTML_MAX_BYTES = 2 * 1024 * 1024
+# PDF 镜像候选模板，按原有尝试顺序排列；各基金公司胜出的模板记录在偏好文件中
+PDF_URL_TEMPLATES = [
+    ("H2", "https://pdf.dfcfw.com/pdf/H2_{report_id}_1.pdf"),
+    ("H3", "https://pdf.dfcfw.com/pdf/H3_{report_id}_1.pdf"),
+    ("H1", "https://pdf.dfcfw.com/pdf/H1_{report_id}_1.pdf"),
+    ("bare", "https://pdf.dfcfw.com/pdf/{report_id}_1.pdf"),
+]
+PDF_URL_TEMPLATE_PREFS_PATH = Path(__file__).resolve().parents[1] / "data" / "pdf_url_templates.json"
+# 镜像探测的 (连接, 读取) 超时，远小于整份下载的 30 秒
+PDF_PROBE_TIMEOUT = (5, 10)
+# 镜像探测线程池大小，由所有下载共享
+PDF_PROBE_WORKERS = int(os.environ.get("PDF_PROBE_WORKERS", "8"))
+PROBE_PDF = "pdf"
+PROBE_NOT_PDF = "not_pdf"
+PROBE_FAILED = "failed"
+# 东方财富公告ID，PDF 镜像地址由它拼出
+_ANNOUNCEMENT_ID = re.compile(r"AN\d+")
+# 公告索引有效期：目标季报不在索引中时，超过该时长才重新请求公告列表
+ANNOUNCEMENT_INDEX_TTL = float(os.environ.get("ANNOUNCEMENT_INDEX_TTL_HOURS", "12")) * 3600
+
 
 def _parse_report_period(report_period: str) -> Tuple[int, int]:
     """解析报告期，返回 (年份, 季度)"""
@@ -48,6 +104,7 @@ def _get_fund_info_by_akshare(fund_code: str) -> Optional[Dict]:
         import akshare as ak
 
         try:
+            throttle(XUEQIU_HOST)
             info_df = ak.fund_individual_basic_info_xq(symbol=fund_code)
             if info_df is not None and not info_df.empty:
                 info_map = {
@@ -59,10 +116,12 @@ def _get_fund_info_by_akshare(fund_code: str) -> Optional[Dict]:
                     "name": info_map.get("基金名称", fund_code),
                     "manager": info_map.get("基金经理", "未知"),
                     "fund_type": info_map.get("基金类型"),
+                    "fund_company": info_map.get("基金公司"),
                 }
         except Exception:
             pass
         try:
+            throttle(EASTMONEY_HOST)
             announcement_df = ak.fund_announcement_personnel_em(symbol=fund_code)
             if announcement_df is not None and not announcement_df.empty:
                 name_col = None
@@ -78,6 +137,7 @@ def _get_fund_info_by_akshare(fund_code: str) -> Optional[Dict]:
                         "name": fund_name if fund_name else fund_code,
                         "manager": "未知",
                         "fund_type": None,
+                        "fund_company": None,
                     }
         except Exception:
             pass
@@ -126,16 +186,82 @@ SAMPLE_REPORTS = {
 
 
 def get_report_viewpoint(fund_code: str, report_period: str) -> Tuple[str, Dict]:
+    viewpoint, fund, _ = get_report_viewpoint_with_source(fund_code, report_period)
+    return viewpoint, fund
+
+
+def get_report_viewpoint_with_source(
+    fund_code: str, report_period: str
+) -> Tuple[str, Dict, Optional[str]]:
+    """返回 (观点, 基金信息, 源PDF的SHA-256)
+
+    仅当观点来自与报告期完全匹配的真实季报时才返回哈希，
+    否则（样例文本、回落到其他或未知报告期）哈希为 None，结果不宜持久缓存。
+    """
+    fund, pdf_path, pdf_hash, exact = _fetch_report_source_with_hash(fund_code, report_period)
+    viewpoint = _parse_report_viewpoint(fund_code, pdf_path, pdf_hash)
+    return viewpoint, fund, pdf_hash if exact else None
+
+
+def _fetch_report_source_with_hash(
+    fund_code: str, report_period: str
+) -> Tuple[Dict, Optional[str], Optional[str], bool]:
+    """网络阶段加上PDF哈希计算，返回 (基金信息, PDF路径, SHA-256, 是否为所请求的报告期)
+
+    哈希同时用作文本缓存的键，回落到其他报告期时也会计算。
+    """
+    fund, pdf_path, exact = _fetch_report_source(fund_code, report_period)
+    pdf_hash = None
+    if pdf_path:
+        try:
+            pdf_hash = _file_sha256(pdf_path)
+        except OSError:
+            logger.warning("计算PDF哈希失败: %s", pdf_path)
+    return fund, str(pdf_path) if pdf_path else None, pdf_hash, exact
+
+
+def _fetch_report_source(
+    fund_code: str, report_period: str
+) -> Tuple[Dict, Optional[Path], bool]:
+    """网络阶段：获取基金信息并下载、校验季报PDF，返回 (基金信息, PDF路径, 是否为所请求的报告期)
+
+    季报清单中已有该报告期的PDF和基金信息时直接返回，不发起任何网络请求。
+    """
+    pdf_path = _manifest_pdf(fund_code, report_period)
+    if pdf_path:
+        fund = _read_manifest(fund_code).get("fund")
+        if fund:
+            logger.info("命中季报清单: %s %s", fund_code, report_period)
+            return fund, pdf_path, True
     fund = _get_fund_info_by_akshare(fund_code)
-    if not fund:
+    if fund:
+        _update_manifest(fund_code, fund=fund)
+    else:
         fund = {
             "code": fund_code,
             "name": fund_code,
             "manager": "未知",
             "fund_type": None,
+            "fund_company": None,
         }
         logger.warning("基金基础信息缺失，使用默认占位信息: %s", fund_code)
-    report_text = _load_real_report_text(fund_code, report_period)
+    if pdf_path:
+        return fund, pdf_path, True
+    pdf_path, exact = _download_valid_pdf(fund_code, report_period)
+    return fund, pdf_path, exact
+
+
+def _parse_report_viewpoint(
+    fund_code: str, pdf_path: Optional[str], pdf_hash: Optional[str] = None
+) -> str:
+    """CPU 阶段：解析PDF文本并提取观点（可在子进程中执行）"""
+    report_text = None
+    if pdf_path:
+        report_text = _extract_pdf_text_cached(Path(pdf_path), pdf_hash)
+        if not report_text:
+            logger.warning("PDF解析为空: %s", pdf_path)
+        else:
+            logger.info("PDF解析成功: %s chars", len(report_text))
     if not report_text:
         report_text = SAMPLE_REPORTS.get(fund_code)
         if report_text:
@@ -154,14 +280,15 @@ def get_report_viewpoint(fund_code: str, report_period: str) -> Tuple[str, Dict]
     if not viewpoint:
         viewpoint = ""
         logger.warning("观点为空: %s", fund_code)
-    return viewpoint, fund
+    return viewpoint
 
 
-def _load_real_report_text(fund_code: str, report_period: str) -> Optional[str]:
-    pdf_path = _download_latest_quarter_report(fund_code, report_period)
+def _download_valid_pdf(fund_code: str, report_period: str) -> Tuple[Optional[Path], bool]:
+    """下载并校验季报PDF，返回 (PDF路径, 是否为所请求的报告期)"""
+    pdf_path, exact = _download_latest_quarter_report(fund_code, report_period)
     if not pdf_path:
         logger.warning("未能下载真实季报PDF: %s %s", fund_code, report_period)
-        return None
+        return None, False
     
     # 验证文件是否为有效的PDF
     try:
@@ -170,94 +297,53 @@ def _load_real_report_text(fund_code: str, report_period: str) -> Optional[str]:
         if not header.startswith(b"%PDF-"):
             logger.warning("下载的文件不是有效的PDF，删除: %s", pdf_path)
             pdf_path.unlink(missing_ok=True)
-            return None
+            return None, False
     except Exception:
         logger.warning("验证PDF文件失败: %s", pdf_path)
-        return None
-    
-    text = _extract_pdf_text(pdf_path)
-    if not text:
-        logger.warning("PDF解析为空: %s", pdf_path)
-    else:
-        logger.info("PDF解析成功: %s chars", len(text))
-    return text
+        return None, False
+    return pdf_path, exact
 
 
 def _download_latest_quarter_report(
     fund_code: str, report_period: str
-) -> Optional[Path]:
-    try:
-        import akshare as ak
-    except Exception:
-        logger.warning("AKShare未安装或导入失败")
-        return None
-    announcement_df = None
-    try:
-        announcement_df = ak.fund_announcement_report_em(symbol=fund_code)
-    except Exception:
-        announcement_df = None
-    if announcement_df is None or announcement_df.empty:
-        try:
-            announcement_df = ak.fund_announcement_personnel_em(symbol=fund_code)
-        except Exception:
-            announcement_df = None
-    if announcement_df is None or announcement_df.empty:
-        logger.warning("公告列表获取失败: %s", fund_code)
-        return None
-    if announcement_df is None or announcement_df.empty:
-        logger.warning("公告列表为空: %s", fund_code)
-        return None
-    name_column = _pick_column(
-        announcement_df.columns, ["名称", "公告标题", "标题", "公告名称"]
-    )
-    date_column = _pick_column(
-        announcement_df.columns, ["发布时间", "公告日期", "发布日期", "日期"]
-    )
-    link_column = _pick_column(
-        announcement_df.columns,
-        ["公告链接", "链接", "url", "URL", "公告url", "公告链接地址"],
-    )
-    report_id_column = _pick_column(
-        announcement_df.columns,
-        ["报告ID", "公告ID", "公告代码", "报告编号", "infocode"],
-    )
-    if not name_column or (not link_column and not report_id_column):
+) -> Tuple[Optional[Path], bool]:
+    """返回 (PDF路径, 是否为所请求的报告期)；只有报告期与公告一致时才登记到季报清单"""
+    pdf_path = _manifest_pdf(fund_code, report_period)
+    if pdf_path:
+        logger.info("命中缓存PDF: %s", pdf_path)
+        return pdf_path, True
+    pdf_path, resolved_period = _download_announced_report(fund_code, report_period)
+    exact = pdf_path is not None and resolved_period == report_period
+    if exact:
+        _update_manifest(fund_code, report_period=report_period, pdf_path=pdf_path)
+    elif pdf_path:
         logger.warning(
-            "公告字段缺失: name=%s link=%s report_id=%s",
-            name_column,
-            link_column,
-            report_id_column,
+            "下载的季报报告期为 %s，与请求的 %s 不一致，不登记清单",
+            resolved_period or "未知",
+            report_period,
         )
-        return None
-    df = announcement_df.copy()
-    df = df[df[name_column].astype(str).str.contains("季度报告|季报", regex=True)]
-    if df.empty:
-        logger.warning("未找到季度报告公告: %s", fund_code)
-        return None
-    if date_column:
-        df[date_column] = df[date_column].apply(_parse_date)
-        df = df.sort_values(date_column, ascending=False)
-    
-    target_year, target_quarter = _parse_report_period(report_period)
-    selected_report = None
-    
-    for _, row in df.iterrows():
-        title = str(row[name_column])
-        report_year, report_quarter = _parse_report_period_from_title(title)
-        if report_year == target_year and report_quarter == target_quarter:
-            selected_report = row
-            logger.info(f"找到对应报告期: {report_period} - {title}")
-            break
-    
-    if selected_report is None:
-        logger.warning(f"未找到报告期 {report_period} 的报告，使用最新报告")
-        selected_report = df.iloc[0]
-    
-    latest = selected_report
+    return pdf_path, exact
+
+
+def _download_announced_report(
+    fund_code: str, report_period: str
+) -> Tuple[Optional[Path], Optional[str]]:
+    """按公告索引定位季报并下载，返回 (PDF路径, 公告的实际报告期)
+
+    公告标题解析不出报告期时实际报告期为 None，命名规则见 _build_report_filename。
+    """
+    announcement = _find_quarter_announcement(fund_code, report_period)
+    if announcement is None:
+        return None, None
+    resolved_period = None
+    if announcement.get("report_year") and announcement.get("report_quarter"):
+        resolved_period = f"{announcement['report_year']}Q{announcement['report_quarter']}"
     
-    report_dir = Path(__file__).resolve().parents[1] / "data" / "reports" / fund_code
+    report_dir = REPORTS_DIR / fund_code
     report_dir.mkdir(parents=True, exist_ok=True)
-    file_path = report_dir / _build_report_filename(latest[name_column], report_period)
+    file_path = report_dir / _build_report_filename(
+        announcement["title"], resolved_period or UNKNOWN_PERIOD_PREFIX
+    )
     
     if file_path.exists():
         try:
@@ -265,7 +351,7 @@ def _download_latest_quarter_report(
                 header = f.read(5)
             if header.startswith(b"%PDF-"):
                 logger.info("命中缓存PDF: %s", file_path)
-                return file_path
+                return file_path, resolved_period
             else:
                 logger.warning("缓存文件不是有效的PDF，删除并重新下载: %s", file_path)
                 file_path.unlink()
@@ -273,111 +359,292 @@ def _download_latest_quarter_report(
             logger.warning("验证缓存PDF失败，删除并重新下载: %s", file_path)
             file_path.unlink(missing_ok=True)
     
+    session = get_session()
+    fund_company = (_read_manifest(fund_code).get("fund") or {}).get("fund_company")
+    candidates = _get_pdf_url_candidates(announcement["report_id"])
+    pdf_url, challenged_urls = _pick_pdf_url(session, candidates, fund_company)
+    if pdf_url:
+        try:
+            logger.info(f"下载PDF: {pdf_url}")
+            saved, _ = _stream_pdf_download(session, pdf_url, file_path)
+            if saved:
+                logger.info(f"✓ 成功下载PDF: {file_path}")
+                return file_path, resolved_period
+        except Exception as e:
+            logger.warning(f"下载失败 {pdf_url}: {e}")
+        challenged_urls.append(pdf_url)
+    
+    # 公告链接与返回了非PDF内容（跳转页、反爬验证）的镜像逐个处理；连接失败的镜像不再重试
     urls_to_try = []
     
-    if link_column:
-        url = str(latest[link_column])
-        if url and url.startswith("http"):
-            urls_to_try.append(url)
+    url = announcement.get("url")
+    if url and url.startswith("http"):
+        urls_to_try.append(url)
     
-    if report_id_column:
-        report_id = str(latest[report_id_column])
-        urls_to_try.extend(_get_pdf_urls(report_id))
+    urls_to_try.extend(challenged_urls)
     
     if not urls_to_try:
         logger.warning("没有可用的URL来下载PDF")
-        return None
-    
-    headers = _get_browser_headers()
-    session = requests.Session()
+        return None, resolved_period
     
     for url in urls_to_try:
         try:
             logger.info(f"尝试下载PDF: {url}")
-            
-            response = session.get(url, headers=headers, timeout=30, allow_redirects=True)
-            response.raise_for_status()
-            content = response.content
-            
-            if content.startswith(b"%PDF-"):
-                file_path.write_bytes(content)
+            throttle(url)
+            saved, body = _stream_pdf_download(session, url, file_path)
+            if saved:
                 logger.info(f"✓ 成功下载PDF: {file_path}")
-                return file_path
+                return file_path, resolved_period
+            if body is None:
+                continue
             
-            if b"<script" in content[:500]:
+            if b"<script" in body[:500]:
                 logger.warning(f"遇到反爬虫JS验证，尝试使用Playwright: {url}")
                 success = _download_with_playwright(url, file_path)
                 if success:
-                    return file_path
+                    return file_path, resolved_period
                 continue
                 
-            pdf_url = _extract_pdf_url_from_html(response.text)
+            pdf_url = _extract_pdf_url_from_html(body.decode("utf-8", errors="replace"))
             if pdf_url:
                 logger.info(f"从HTML中提取到PDF链接: {pdf_url}")
-                pdf_response = session.get(pdf_url, headers=headers, timeout=30)
-                pdf_response.raise_for_status()
-                pdf_content = pdf_response.content
-                if pdf_content.startswith(b"%PDF-"):
-                    file_path.write_bytes(pdf_content)
+                throttle(pdf_url)
+                saved, _ = _stream_pdf_download(session, pdf_url, file_path)
+                if saved:
                     logger.info(f"✓ 成功下载PDF: {file_path}")
-                    return file_path
+                    return file_path, resolved_period
                     
         except Exception as e:
             logger.warning(f"下载失败 {url}: {e}")
             continue
     
     logger.warning("所有下载方法都失败了")
+    return None, resolved_period
+
+
+_manifest_lock = threading.Lock()
+
+
+def _read_manifest(fund_code: str) -> Dict:
+    manifest_path = REPORTS_DIR / fund_code / MANIFEST_NAME
+    try:
+        with manifest_path.open("r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception:
+        logger.warning("季报清单损坏，忽略: %s", manifest_path)
+        return {}
+    if not isinstance(manifest, dict):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        # 旧版本按文件名前缀登记，可能把回落得到的季报记在请求的报告期下
+        manifest.pop("reports", None)
+    return manifest
+
+
+def _manifest_pdf(fund_code: str, report_period: str) -> Optional[Path]:
+    """查季报清单，报告期对应的PDF存在且文件头有效时返回路径"""
+    filename = _read_manifest(fund_code).get("reports", {}).get(report_period)
+    if not filename:
+        return None
+    pdf_path = REPORTS_DIR / fund_code / filename
+    try:
+        with pdf_path.open("rb") as f:
+            if f.read(5).startswith(b"%PDF-"):
+                return pdf_path
+    except OSError:
+        pass
+    logger.warning("季报清单中的PDF缺失或无效: %s", pdf_path)
     return None
 
 
-def _download_with_playwright(url: str, output_path: Path) -> bool:
-    """使用 Playwright 下载 PDF（处理反爬虫） - 通过 subprocess 调用独立脚本"""
-    import subprocess
-    import json
-    
-    worker_script = Path(__file__).resolve().parents[1] / "scripts" / "download_pdf_worker.py"
-    
-    if not worker_script.exists():
-        logger.warning(f"下载工作脚本不存在: {worker_script}")
-        return False
-    
+def _update_manifest(
+    fund_code: str,
+    report_period: Optional[str] = None,
+    pdf_path: Optional[Path] = None,
+    fund: Optional[Dict] = None,
+) -> None:
+    """记录PDF或基金信息；调用方需确认 PDF 确实属于 report_period"""
+    manifest_path = REPORTS_DIR / fund_code / MANIFEST_NAME
+    with _manifest_lock:
+        manifest = _read_manifest(fund_code)
+        if pdf_path is not None and report_period:
+            manifest.setdefault("reports", {})[report_period] = pdf_path.name
+        if fund is not None:
+            if manifest.get("fund") == fund and manifest.get("version") == MANIFEST_VERSION:
+                return
+            manifest["fund"] = fund
+        manifest["version"] = MANIFEST_VERSION
+        tmp_path = manifest_path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+        try:
+            manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, manifest_path)
+        except Exception:
+            logger.warning("写入季报清单失败: %s", manifest_path)
+            tmp_path.unlink(missing_ok=True)
+
+
+def _find_quarter_announcement(fund_code: str, report_period: str) -> Optional[Dict]:
+    """从本地公告索引查找报告期对应的季报，找不到时回落到最新季报
+
+    目标季报不在索引中且索引超过 ANNOUNCEMENT_INDEX_TTL 未刷新时，
+    才请求一次公告列表并增量写入索引。
+    """
+    target_year, target_quarter = _parse_report_period(report_period)
+    announcement = find_quarter_announcement(fund_code, target_year, target_quarter)
+    if announcement is None and not is_announcement_index_fresh(
+        fund_code, ANNOUNCEMENT_INDEX_TTL
+    ):
+        announcements = _fetch_quarter_announcements(fund_code)
+        if announcements is not None:
+            added = upsert_announcements(fund_code, announcements)
+            logger.info("刷新公告索引: %s 共%s条季报公告, 新增%s条", fund_code, len(announcements), added)
+            announcement = find_quarter_announcement(fund_code, target_year, target_quarter)
+    if announcement is not None:
+        logger.info(f"找到对应报告期: {report_period} - {announcement['title']}")
+        return announcement
+    latest = find_quarter_announcement(fund_code)
+    if latest is None:
+        logger.warning("未找到季度报告公告: %s", fund_code)
+    else:
+        logger.warning(f"未找到报告期 {report_period} 的报告，使用最新报告")
+    return latest
+
+
+def _fetch_quarter_announcements(fund_code: str) -> Optional[List[Dict]]:
+    """请求基金公告列表，返回季报公告；列表获取失败时返回 None"""
     try:
-        logger.info(f"通过 subprocess 调用下载脚本: {worker_script}")
-        
-        result = subprocess.run(
-            [
-                sys.executable,
-                str(worker_script),
-                url,
-                str(output_path)
-            ],
-            capture_output=True,
-            text=True,
-            timeout=120
+        import akshare as ak
+    except Exception:
+        logger.warning("AKShare未安装或导入失败")
+        return None
+    announcement_df = None
+    try:
+        throttle(EASTMONEY_HOST)
+        announcement_df = ak.fund_announcement_report_em(symbol=fund_code)
+    except Exception:
+        announcement_df = None
+    if announcement_df is None or announcement_df.empty:
+        try:
+            throttle(EASTMONEY_HOST)
+            announcement_df = ak.fund_announcement_personnel_em(symbol=fund_code)
+        except Exception:
+            announcement_df = None
+    if announcement_df is None or announcement_df.empty:
+        logger.warning("公告列表获取失败: %s", fund_code)
+        return None
+    name_column = _pick_column(
+        announcement_df.columns, ["名称", "公告标题", "标题", "公告名称"]
+    )
+    date_column = _pick_column(
+        announcement_df.columns, ["发布时间", "公告日期", "发布日期", "日期"]
+    )
+    link_column = _pick_column(
+        announcement_df.columns,
+        ["公告链接", "链接", "url", "URL", "公告url", "公告链接地址"],
+    )
+    report_id_column = _pick_column(
+        announcement_df.columns,
+        ["报告ID", "公告ID", "公告代码", "报告编号", "infocode"],
+    )
+    if not name_column or (not link_column and not report_id_column):
+        logger.warning(
+            "公告字段缺失: name=%s link=%s report_id=%s",
+            name_column,
+            link_column,
+            report_id_column,
         )
-        
-        if result.returncode == 0:
-            try:
-                data = json.loads(result.stdout)
-                if data.get("success"):
-                    logger.info(f"✓ subprocess 下载成功: {data.get('path')}")
-                    return True
-                else:
-                    logger.warning(f"subprocess 下载失败: {data.get('error')}")
-            except json.JSONDecodeError:
-                logger.warning(f"解析 subprocess 输出失败: {result.stdout}")
-        else:
-            logger.warning(f"subprocess 执行失败: {result.stderr}")
-            
-    except subprocess.TimeoutExpired:
-        logger.warning("subprocess 下载超时")
-    except Exception as e:
-        logger.warning(f"subprocess 调用失败: {e}")
-    
-    return False
+        return None
+    df = announcement_df[
+        announcement_df[name_column].astype(str).str.contains("季度报告|季报", regex=True)
+    ]
+    announcements = []
+    for _, row in df.iterrows():
+        title = str(row[name_column])
+        url = _cell_text(row[link_column]) if link_column else None
+        report_id = _cell_text(row[report_id_column]) if report_id_column else None
+        # 没有报告ID时以公告链接去重，report_id 保持为空
+        dedupe_key = report_id or url
+        if not dedupe_key:
+            continue
+        publish_date = _parse_date(row[date_column]) if date_column else datetime.min
+        report_year, report_quarter = _parse_report_period_from_title(title)
+        announcements.append(
+            {
+                "dedupe_key": dedupe_key,
+                "report_id": report_id,
+                "title": title,
+                "publish_date": (
+                    publish_date.strftime("%Y-%m-%d") if publish_date != datetime.min else None
+                ),
+                "url": url,
+                "report_year": report_year,
+                "report_quarter": report_quarter,
+            }
+        )
+    return announcements
+
+
+def _stream_pdf_download(session, url: str, file_path: Path) -> Tuple[bool, Optional[bytes]]:
+    """流式下载PDF，返回 (是否已保存, 非PDF响应的正文)
+
+    首块不是 %PDF- 时立即停止，只读取不超过 PDF_HTML_MAX_BYTES 的正文供调用方
+    识别反爬页面或提取跳转链接（超限时正文为 None）；PDF 分块写入同目录临时文件，
+    超过 PDF_MAX_BYTES 抛出 ValueError，完整下载后原子重命名为 file_path，
+    中途失败不会留下半截文件。
+    """
+    with session.get(url, timeout=30, allow_redirects=True, stream=True) as response:
+        response.raise_for_status()
+        content_length = int(response.headers.get("Content-Length") or 0)
+        if content_length > PDF_MAX_BYTES:
+            raise ValueError(f"PDF超过大小上限: {content_length} > {PDF_MAX_BYTES} bytes")
+        chunks = response.iter_content(chunk_size=PDF_CHUNK_SIZE)
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= 512:
+                break
+        if not head.startswith(b"%PDF-"):
+            body = head
+            for chunk in chunks:
+                body += chunk
+                if len(body) > PDF_HTML_MAX_BYTES:
+                    logger.warning("非PDF响应过大，放弃解析: %s", url)
+                    return False, None
+            return False, body
+        _write_pdf_atomic(file_path, head, chunks)
+        return True, None
+
+
+def _write_pdf_atomic(file_path: Path, head: bytes, chunks) -> None:
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".part", dir=file_path.parent)
+    tmp_path = Path(tmp_name)
+    try:
+        size = len(head)
+        with os.fdopen(fd, "wb") as f:
+            f.write(head)
+            for chunk in chunks:
+                size += len(chunk)
+                if size > PDF_MAX_BYTES:
+                    raise ValueError(f"PDF超过大小上限: > {PDF_MAX_BYTES} bytes")
+                f.write(chunk)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def _download_with_playwright(url: str, output_path: Path) -> bool:
+    """使用 Playwright 下载 PDF（处理反爬虫），常驻浏览器不可用时回落到单次 subprocess"""
+    return download_pdf_with_browser(url, output_path)
 
 
 def _build_report_filename(title: str, report_period: str) -> str:
+    """以标题中的报告期为前缀，标题解析不出时用 report_period"""
     suffix = report_period
     match = re.search(r"(\d{4})年?第([一二三四1234])季度", title)
     if match:
@@ -390,20 +657,62 @@ def _build_report_filename(title: str, report_period: str) -> str:
     return f"{suffix}_{safe_title}.pdf"
 
 
-def _extract_pdf_text(pdf_path: Path) -> Optional[str]:
-    try:
-        import pdfplumber
-    except Exception:
-        logger.warning("pdfplumber未安装或导入失败")
-        return None
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _extract_pdf_text_cached(pdf_path: Path, pdf_hash: Optional[str] = None) -> Optional[str]:
+    """带持久缓存的PDF文本提取，缓存键为PDF内容的SHA-256、提取器版本与后端设置"""
+    if not pdf_hash:
+        try:
+            pdf_hash = _file_sha256(pdf_path)
+        except OSError:
+            logger.warning("计算PDF哈希失败: %s", pdf_path)
+            return _extract_pdf_text(pdf_path)
+
+    cache_path = (
+        TEXT_CACHE_DIR / f"{pdf_hash}_v{PDF_TEXT_EXTRACTOR_VERSION}_{PDF_TEXT_BACKEND}.txt.gz"
+    )
+    if cache_path.exists():
+        try:
+            with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+                text = f.read()
+            logger.info("命中文本缓存: %s", cache_path.name)
+            return text
+        except Exception:
+            logger.warning("文本缓存损坏，删除并重新解析: %s", cache_path)
+            cache_path.unlink(missing_ok=True)
+
+    text = _extract_pdf_text(pdf_path)
+    if text:
+        _write_text_cache(cache_path, text)
+        # 只清理旧提取器版本的缓存，同版本其他后端的缓存保留
+        current_prefix = f"{pdf_hash}_v{PDF_TEXT_EXTRACTOR_VERSION}_"
+        for stale in TEXT_CACHE_DIR.glob(f"{pdf_hash}_v*.txt.gz"):
+            if not stale.name.startswith(current_prefix):
+                stale.unlink(missing_ok=True)
+    return text
+
+
+def _write_text_cache(cache_path: Path, text: str) -> None:
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
     try:
-        with pdfplumber.open(str(pdf_path)) as pdf:
-            pages = [page.extract_text() for page in pdf.pages]
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
     except Exception:
-        logger.exception("PDF解析异常: %s", pdf_path)
-        return None
-    text = "\n".join([page for page in pages if page])
-    return text if text.strip() else None
+        logger.warning("写入文本缓存失败: %s", cache_path)
+        tmp_path.unlink(missing_ok=True)
+
+
+def _extract_pdf_text(pdf_path: Path, targeted: bool = True) -> Optional[str]:
+    """提取PDF文本，后端选择与 §4 页定位见 pdf_text.extract_pdf_text"""
+    return extract_pdf_text(pdf_path, targeted=targeted)
 
 
 def _extract_pdf_url_from_html(html: str) -> Optional[str]:
@@ -419,31 +728,151 @@ def _build_pdf_url_from_report_id(report_id: str) -> Optional[str]:
     return f"https://pdf.dfcfw.com/pdf/H2_{report_id}_1.pdf"
 
 
-def _get_pdf_urls(report_id: str) -> list[str]:
-    """生成多个可能的PDF URL格式"""
-    urls = []
-    if report_id.startswith("AN"):
-        urls.append(f"https://pdf.dfcfw.com/pdf/H2_{report_id}_1.pdf")
-        urls.append(f"https://pdf.dfcfw.com/pdf/H3_{report_id}_1.pdf")
-        urls.append(f"https://pdf.dfcfw.com/pdf/H1_{report_id}_1.pdf")
-        urls.append(f"https://pdf.dfcfw.com/pdf/{report_id}_1.pdf")
-    return urls
-
-
-def _get_browser_headers() -> dict:
-    """获取模拟浏览器的请求头"""
-    return {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Cache-Control": "max-age=0",
+def _get_pdf_url_candidates(report_id: Optional[str]) -> List[Tuple[str, str]]:
+    """生成多个可能的PDF URL格式，返回 (模板名, URL)；只有 AN 开头的公告ID才有镜像"""
+    if not report_id or not _ANNOUNCEMENT_ID.fullmatch(report_id):
+        return []
+    return [(name, template.format(report_id=report_id)) for name, template in PDF_URL_TEMPLATES]
+
+
+def _pick_pdf_url(
+    session, candidates: List[Tuple[str, str]], fund_company: Optional[str]
+) -> Tuple[Optional[str], List[str]]:
+    """选出返回 PDF 的候选 URL，返回 (URL, 返回了非PDF内容的候选列表)
+
+    该基金公司已记录过胜出模板时先单独探测它，否则在共享线程池中并发探测
+    全部候选，取最先返回 %PDF- 的一个。每个探测各自经过主机限速；有候选胜出后，
+    尚未发出的探测直接跳过，已在读取的探测尽快关闭响应。
+    """
+    if not candidates:
+        return None, []
+    challenged: List[str] = []
+    preferred = _get_preferred_template(fund_company)
+    if preferred:
+        for name, url in candidates:
+            if name == preferred:
+                status = _probe_pdf_url(session, url)
+                if status == PROBE_PDF:
+                    return url, challenged
+                if status == PROBE_NOT_PDF:
+                    challenged.append(url)
+                candidates = [item for item in candidates if item[0] != preferred]
+                break
+    if not candidates:
+        return None, challenged
+
+    stop = threading.Event()
+    executor = _get_probe_executor()
+    futures = {
+        executor.submit(_probe_pdf_url, session, url, stop): (name, url) for name, url in candidates
     }
+    statuses: Dict[str, str] = {}
+    try:
+        for future in as_completed(futures):
+            name, url = futures[future]
+            statuses[url] = future.result()
+            if statuses[url] == PROBE_PDF:
+                logger.info("PDF镜像竞速胜出: %s (%s)", name, url)
+                _remember_template(fund_company, name)
+                return url, challenged
+    finally:
+        stop.set()
+        for future in futures:
+            future.cancel()
+    challenged.extend(url for _, url in candidates if statuses.get(url) == PROBE_NOT_PDF)
+    return None, challenged
+
+
+_probe_executor_lock = threading.Lock()
+_probe_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_probe_executor() -> ThreadPoolExecutor:
+    """镜像探测共用的线程池，避免每次下载都新建线程"""
+    global _probe_executor
+    with _probe_executor_lock:
+        if _probe_executor is None:
+            _probe_executor = ThreadPoolExecutor(
+                max_workers=PDF_PROBE_WORKERS, thread_name_prefix="pdf-probe"
+            )
+        return _probe_executor
+
+
+def _probe_pdf_url(session, url: str, stop: Optional[threading.Event] = None) -> str:
+    """用 Range 请求读取开头 1KB 判断是否为 PDF；stop 被设置时放弃探测"""
+    throttle(url)
+    if stop is not None and stop.is_set():
+        return PROBE_FAILED
+    try:
+        with session.get(
+            url,
+            headers={"Range": "bytes=0-1023"},
+            timeout=PDF_PROBE_TIMEOUT,
+            allow_redirects=True,
+            stream=True,
+        ) as response:
+            # 其他候选已胜出时不再读取响应体，退出 with 即关闭连接
+            if stop is not None and stop.is_set():
+                return PROBE_FAILED
+            if response.status_code not in (200, 206):
+                return PROBE_FAILED
+            head = b""
+            for chunk in response.iter_content(chunk_size=1024):
+                head += chunk
+                if len(head) >= 5:
+                    break
+            return PROBE_PDF if head.startswith(b"%PDF-") else PROBE_NOT_PDF
+    except Exception as e:
+        logger.debug("探测PDF失败 %s: %s", url, e)
+        return PROBE_FAILED
+
+
+_template_lock = threading.Lock()
+_template_preferences: Optional[Dict[str, str]] = None
+
+
+def _load_template_preferences() -> Dict[str, str]:
+    global _template_preferences
+    if _template_preferences is None:
+        try:
+            with PDF_URL_TEMPLATE_PREFS_PATH.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            _template_preferences = data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            _template_preferences = {}
+        except Exception:
+            logger.warning("PDF镜像偏好文件损坏，忽略: %s", PDF_URL_TEMPLATE_PREFS_PATH)
+            _template_preferences = {}
+    return _template_preferences
+
+
+def _get_preferred_template(fund_company: Optional[str]) -> Optional[str]:
+    if not fund_company:
+        return None
+    with _template_lock:
+        return _load_template_preferences().get(fund_company)
+
+
+def _remember_template(fund_company: Optional[str], name: str) -> None:
+    """记录基金公司胜出的镜像模板，后续同公司的基金优先探测"""
+    if not fund_company:
+        return
+    with _template_lock:
+        preferences = _load_template_preferences()
+        if preferences.get(fund_company) == name:
+            return
+        preferences[fund_company] = name
+        tmp_path = PDF_URL_TEMPLATE_PREFS_PATH.with_name(
+            f"{PDF_URL_TEMPLATE_PREFS_PATH.name}.{os.getpid()}.tmp"
+        )
+        try:
+            PDF_URL_TEMPLATE_PREFS_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(preferences, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, PDF_URL_TEMPLATE_PREFS_PATH)
+        except Exception:
+            logger.warning("写入PDF镜像偏好失败: %s", PDF_URL_TEMPLATE_PREFS_PATH)
+            tmp_path.unlink(missing_ok=True)
 
 
 def _pick_column(columns, candidates) -> Optional[str]:
@@ -457,6 +886,11 @@ def _pick_column(columns, candidates) -> Optional[str]:
     return None
 
 
+def _cell_text(value) -> Optional[str]:
+    text = str(value).strip() if value is not None else ""
+    return None if text.lower() in ("", "nan", "none", "nat") else text
+
+
 def _parse_date(value) -> datetime:
     if isinstance(value, datetime):
         return value
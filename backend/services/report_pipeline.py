@@ -0,0 +1,158 @@
+"""批量观点提取的分阶段流水线
+
+下载阶段（akshare 查询、PDF 下载）在 I/O 线程池中执行，
+PDF 解析与观点提取在进程池中执行，两者之间用有界队列连接，
+使第 N 只基金的解析与第 N+1 只基金的下载重叠进行。
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.services.report_parser import _fetch_report_source, _parse_report_viewpoint
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def iter_report_viewpoints(
+    fund_codes: List[str],
+    report_period: str,
+    io_workers: int = 4,
+    cpu_workers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """按输入顺序逐个产出观点提取结果
+
+    每项结果包含 fund_code、viewpoint、fund_info、error、elapsed_seconds，
+    失败时 viewpoint/fund_info 为 None，error 为异常信息。
+    """
+    cpu_workers = cpu_workers or os.cpu_count() or 1
+    queue_size = queue_size or cpu_workers * 2
+    total = len(fund_codes)
+
+    # 下载完成、等待解析的任务；队列满时下载线程阻塞，形成背压
+    parse_queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    # 已提交进程池的解析任务数上限
+    cpu_slots = threading.Semaphore(cpu_workers * 2)
+    started_at: Dict[int, float] = {}
+    finished_at: Dict[int, float] = {}
+    stage_results: Dict[int, Any] = {}
+    ready = threading.Condition()
+
+    def publish(index: int, value: Any) -> None:
+        with ready:
+            stage_results[index] = value
+            ready.notify_all()
+
+    def download(index: int, fund_code: str) -> None:
+        started_at[index] = time.time()
+        try:
+            fund, pdf_path, _ = _fetch_report_source(fund_code, report_period)
+        except Exception as exc:
+            logger.warning("下载阶段失败: %s %s", fund_code, exc)
+            finished_at[index] = time.time()
+            publish(index, exc)
+            return
+        parse_queue.put((index, fund_code, fund, str(pdf_path) if pdf_path else None))
+
+    def parse_in_thread(index: int, fund_code: str, pdf_path: Optional[str]) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(_parse_report_viewpoint(fund_code, pdf_path))
+        except Exception as exc:
+            future.set_exception(exc)
+        finished_at[index] = time.time()
+        return future
+
+    def dispatch(cpu_pool: ProcessPoolExecutor) -> None:
+        pool_broken = False
+        while True:
+            item = parse_queue.get()
+            if item is _STOP:
+                return
+            index, fund_code, fund, pdf_path = item
+            try:
+                if pool_broken:
+                    future = parse_in_thread(index, fund_code, pdf_path)
+                else:
+                    cpu_slots.acquire()
+                    try:
+                        future = cpu_pool.submit(_parse_report_viewpoint, fund_code, pdf_path)
+                    except BrokenProcessPool:
+                        # 子进程异常退出（如内存不足被杀），之后的任务改为在分发线程内解析，
+                        # 保证队列持续被消费，下载线程不会阻塞在满队列上
+                        cpu_slots.release()
+                        pool_broken = True
+                        logger.warning("解析进程池已损坏，改为线程内解析: %s", fund_code)
+                        future = parse_in_thread(index, fund_code, pdf_path)
+                    else:
+
+                        def on_done(_: Future, index: int = index) -> None:
+                            finished_at[index] = time.time()
+                            cpu_slots.release()
+
+                        future.add_done_callback(on_done)
+            except Exception as exc:
+                # 分发线程不能退出，否则生成器会一直等待该序号的结果
+                logger.warning("分发解析任务失败: %s %s", fund_code, exc)
+                finished_at[index] = time.time()
+                publish(index, exc)
+                continue
+            publish(index, (fund, future))
+
+    # 下载线程运行时 fork 子进程可能继承被占用的锁，统一使用 spawn
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=cpu_workers, mp_context=mp_context) as cpu_pool:
+        io_pool = ThreadPoolExecutor(max_workers=io_workers)
+        dispatcher = threading.Thread(target=dispatch, args=(cpu_pool,), daemon=True)
+        dispatcher.start()
+        try:
+            for index, fund_code in enumerate(fund_codes):
+                io_pool.submit(download, index, fund_code)
+
+            for index in range(total):
+                with ready:
+                    ready.wait_for(lambda: index in stage_results)
+                    value = stage_results.pop(index)
+                yield _build_result(fund_codes[index], value, started_at, finished_at, index)
+        finally:
+            # 先让已开始的下载写入队列，再通知分发线程退出
+            io_pool.shutdown(wait=True, cancel_futures=True)
+            parse_queue.put(_STOP)
+            dispatcher.join()
+
+
+def _build_result(
+    fund_code: str,
+    value: Any,
+    started_at: Dict[int, float],
+    finished_at: Dict[int, float],
+    index: int,
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "fund_code": fund_code,
+        "viewpoint": None,
+        "fund_info": None,
+        "error": None,
+    }
+    if isinstance(value, Exception):
+        result["error"] = str(value)
+    else:
+        fund, future = value
+        try:
+            result["viewpoint"] = future.result()
+            result["fund_info"] = fund
+        except Exception as exc:
+            logger.warning("解析阶段失败: %s %s", fund_code, exc)
+            result["error"] = str(exc)
+    elapsed = finished_at.get(index, time.time()) - started_at.get(index, time.time())
+    result["elapsed_seconds"] = round(elapsed, 1)
+    return result
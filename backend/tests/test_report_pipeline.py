@@ -0,0 +1,53 @@
+"""批量流水线回归测试：解析子进程异常退出时不能卡死
+
+运行：python -m pytest backend/tests
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.services import report_pipeline
+
+CRASH_CODE = "000013"
+
+
+def _fake_fetch(fund_code, report_period):
+    return {"code": fund_code, "name": fund_code}, Path(f"/tmp/{fund_code}.pdf"), True
+
+
+def _crashing_parse(fund_code, pdf_path, pdf_hash=None):
+    """在子进程中执行；遇到指定代码时直接退出进程，模拟被系统杀掉"""
+    if fund_code == CRASH_CODE:
+        os._exit(1)
+    return f"观点{fund_code}"
+
+
+def test_pipeline_survives_dead_parse_worker(monkeypatch):
+    monkeypatch.setattr(report_pipeline, "_fetch_report_source", _fake_fetch)
+    monkeypatch.setattr(report_pipeline, "_parse_report_viewpoint", _crashing_parse)
+    codes = [f"{i:06d}" for i in range(29)]
+    results = []
+
+    def run():
+        results.extend(
+            report_pipeline.iter_report_viewpoints(
+                codes, "2024Q4", io_workers=4, cpu_workers=2, queue_size=2
+            )
+        )
+
+    runner = threading.Thread(target=run, daemon=True)
+    runner.start()
+    runner.join(timeout=60)
+    assert not runner.is_alive(), "流水线在解析进程退出后卡死"
+
+    assert [item["fund_code"] for item in results] == codes
+    crashed = next(item for item in results if item["fund_code"] == CRASH_CODE)
+    assert crashed["error"] and crashed["viewpoint"] is None
+    # 进程池损坏后提交的任务回落到线程内解析，仍能得到结果
+    assert results[-1]["viewpoint"] == f"观点{codes[-1]}"
+    for item in results:
+        assert item["error"] or item["viewpoint"] == f"观点{item['fund_code']}"
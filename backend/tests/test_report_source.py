@@ -0,0 +1,79 @@
+"""季报来源回归测试：回落到其他或未知报告期的PDF不能登记为所请求的报告期
+
+运行：python -m pytest backend/tests
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from backend.services import report_parser
+
+FUND = {"code": "000001", "name": "测试基金", "manager": "某人", "fund_company": None}
+
+
+def _setup(monkeypatch, tmp_path, announcement):
+    monkeypatch.setattr(report_parser, "REPORTS_DIR", tmp_path)
+    monkeypatch.setattr(report_parser, "_get_fund_info_by_akshare", lambda code: dict(FUND))
+    monkeypatch.setattr(
+        report_parser, "_find_quarter_announcement", lambda code, period: dict(announcement)
+    )
+    monkeypatch.setattr(
+        report_parser, "_pick_pdf_url", lambda session, candidates, company: (candidates[0][1], [])
+    )
+
+    def fake_download(session, url, file_path):
+        file_path.write_bytes(b"%PDF-1.4 test")
+        return True, None
+
+    monkeypatch.setattr(report_parser, "_stream_pdf_download", fake_download)
+
+
+def _manifest_reports(tmp_path):
+    manifest_path = tmp_path / FUND["code"] / report_parser.MANIFEST_NAME
+    return json.loads(manifest_path.read_text(encoding="utf-8")).get("reports", {})
+
+
+def test_unknown_quarter_fallback_is_not_registered(monkeypatch, tmp_path):
+    # 标题通过了“季度报告”过滤，但解析不出报告期
+    _setup(
+        monkeypatch,
+        tmp_path,
+        {"report_id": "AN1", "title": "测试基金2024年1季度报告", "url": None,
+         "report_year": 0, "report_quarter": 0},
+    )
+    fund, pdf_path, pdf_hash, exact = report_parser._fetch_report_source_with_hash(
+        FUND["code"], "2024Q4"
+    )
+    assert pdf_path and not exact
+    assert not Path(pdf_path).name.startswith("2024Q4_")
+    assert pdf_hash
+    assert _manifest_reports(tmp_path) == {}
+
+
+def test_exact_quarter_is_registered(monkeypatch, tmp_path):
+    _setup(
+        monkeypatch,
+        tmp_path,
+        {"report_id": "AN2", "title": "测试基金2024年第4季度报告", "url": None,
+         "report_year": 2024, "report_quarter": 4},
+    )
+    _, pdf_path, _, exact = report_parser._fetch_report_source_with_hash(FUND["code"], "2024Q4")
+    assert exact
+    assert _manifest_reports(tmp_path) == {"2024Q4": Path(pdf_path).name}
+    # 再次请求命中清单，不再查公告
+    monkeypatch.setattr(report_parser, "_find_quarter_announcement", None)
+    assert report_parser._fetch_report_source(FUND["code"], "2024Q4")[1:] == (Path(pdf_path), True)
+
+
+def test_old_manifest_reports_are_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_parser, "REPORTS_DIR", tmp_path)
+    fund_dir = tmp_path / FUND["code"]
+    fund_dir.mkdir()
+    (fund_dir / "2024Q4_x.pdf").write_bytes(b"%PDF-1.4")
+    (fund_dir / report_parser.MANIFEST_NAME).write_text(
+        json.dumps({"reports": {"2024Q4": "2024Q4_x.pdf"}, "fund": FUND}), encoding="utf-8"
+    )
+    assert report_parser._manifest_pdf(FUND["code"], "2024Q4") is None
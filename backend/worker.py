@@ -0,0 +1,73 @@
+"""独立的播客生成 worker 进程
+
+从数据库 jobs 表领取播客任务并执行，API 进程只负责入队与查询，可以按需启动多个 worker：
+
+    PODCAST_INPROCESS_WORKER=0 uvicorn backend.main:app
+    python -m backend.worker --concurrency 2
+
+各进程通过任务租约协调，同一任务只会被一个进程执行；进程退出后未完成任务的租约到期，
+由其他 worker 回收重试。
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+from backend.database import init_db
+from backend.services.podcast_generator import (
+    PODCAST_WORKERS,
+    create_podcast_queue,
+    requeue_unfinished_podcasts,
+)
+from backend.services.report_async import shutdown_executors
+
+
+async def run(concurrency: int) -> None:
+    init_db()
+    jobs = create_podcast_queue(concurrency)
+    requeue_unfinished_podcasts(jobs)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows 不支持，依赖 KeyboardInterrupt 退出
+            pass
+
+    jobs.start()
+    logger.info("播客 worker 已启动，等待任务")
+    try:
+        await stop.wait()
+    finally:
+        logger.info("播客 worker 正在退出")
+        await jobs.stop()
+        shutdown_executors()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="播客生成 worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=PODCAST_WORKERS,
+        help="同时生成的播客数（默认取 PODCAST_WORKERS）",
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.concurrency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
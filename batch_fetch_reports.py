@@ -6,6 +6,7 @@ import json
 import logging
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent
@@ -53,23 +54,91 @@ def fetch_report(fund_code: str, report_period: str) -> dict:
         }
 
 
-def batch_fetch(fund_codes: list[str], report_period: str, interval: float = 1.0) -> dict:
-    results = []
-    total = len(fund_codes)
+def _print_progress(idx: int, total: int, result: dict) -> None:
+    code = result["fund_code"]
+    if result["success"]:
+        vp_len = len(result.get("viewpoint", ""))
+        name = result.get("fund_name", code)
+        print(f"[{idx}/{total}] ✓ {code} {name} - 观点{vp_len}字 ({result['elapsed_seconds']}s)")
+    else:
+        print(f"[{idx}/{total}] ✗ {code} - {result.get('error', '未知错误')}")
 
+
+def _iter_results_sequential(fund_codes: list[str], report_period: str, interval: float):
+    total = len(fund_codes)
     for i, code in enumerate(fund_codes):
-        result = fetch_report(code, report_period)
-        results.append(result)
-        idx = i + 1
-        if result["success"]:
-            vp_len = len(result.get("viewpoint", ""))
-            name = result.get("fund_name", code)
-            print(f"[{idx}/{total}] ✓ {code} {name} - 观点{vp_len}字 ({result['elapsed_seconds']}s)")
+        yield fetch_report(code, report_period)
+        if i + 1 < total:
+            time.sleep(interval)
+
+
+def _iter_results_concurrent(fund_codes: list[str], report_period: str, interval: float, workers: int):
+    """线程池并发拉取，按主机限速代替全局 sleep，结果按输入顺序产出"""
+    from backend.services.http_client import set_host_rate_limit, set_pool_size
+
+    set_host_rate_limit(interval)
+    set_pool_size(max(workers, 16))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch_report, code, report_period) for code in fund_codes]
+        for future in futures:
+            yield future.result()
+
+
+def _iter_results_pipelined(
+    fund_codes: list[str], report_period: str, interval: float, workers: int, processes: int
+):
+    """下载走线程池、PDF 解析走进程池的流水线模式"""
+    from backend.services.http_client import set_host_rate_limit, set_pool_size
+    from backend.services.report_pipeline import iter_report_viewpoints
+
+    set_host_rate_limit(interval)
+    set_pool_size(max(workers, 16))
+    for item in iter_report_viewpoints(
+        fund_codes, report_period, io_workers=max(workers, 1), cpu_workers=processes
+    ):
+        if item["error"] is None:
+            fund_info = item["fund_info"]
+            yield {
+                "fund_code": item["fund_code"],
+                "fund_name": fund_info.get("name", ""),
+                "manager": fund_info.get("manager", ""),
+                "report_period": report_period,
+                "viewpoint": item["viewpoint"] or "",
+                "success": True,
+                "elapsed_seconds": item["elapsed_seconds"],
+            }
         else:
-            print(f"[{idx}/{total}] ✗ {code} - {result.get('error', '未知错误')}")
+            yield {
+                "fund_code": item["fund_code"],
+                "report_period": report_period,
+                "success": False,
+                "error": item["error"],
+                "elapsed_seconds": item["elapsed_seconds"],
+            }
+
+
+def batch_fetch(
+    fund_codes: list[str],
+    report_period: str,
+    interval: float = 1.0,
+    workers: int = 1,
+    processes: int = 0,
+) -> dict:
+    results = []
+    total = len(fund_codes)
 
-        if idx < total:
-            time.sleep(interval)
+    if processes > 0:
+        iter_results = _iter_results_pipelined(
+            fund_codes, report_period, interval, workers, processes
+        )
+    elif workers > 1:
+        iter_results = _iter_results_concurrent(fund_codes, report_period, interval, workers)
+    else:
+        iter_results = _iter_results_sequential(fund_codes, report_period, interval)
+
+    for idx, result in enumerate(iter_results, start=1):
+        results.append(result)
+        _print_progress(idx, total, result)
 
     success = [r for r in results if r["success"]]
     failed = [r for r in results if not r["success"]]
@@ -108,7 +177,19 @@ def main():
         "--interval",
         type=float,
         default=1.0,
-        help="每只基金之间的间隔秒数 (默认: 1.0)",
+        help="每只基金之间的间隔秒数；并发模式下为同一主机的最小请求间隔 (默认: 1.0)",
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=1,
+        help="并发拉取的线程数，大于 1 时启用并发模式 (默认: 1)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="PDF 解析进程数，大于 0 时启用下载/解析流水线模式，下载线程数由 --workers 指定 (默认: 0)",
     )
     args = parser.parse_args()
 
@@ -121,10 +202,10 @@ def main():
         print("未找到基金代码", file=sys.stderr)
         sys.exit(1)
 
-    print(f"开始批量拉取: {len(fund_codes)} 只基金, 报告期: {args.period}")
+    print(f"开始批量拉取: {len(fund_codes)} 只基金, 报告期: {args.period}, 并发: {max(args.workers, 1)}")
     print("-" * 60)
 
-    output = batch_fetch(fund_codes, args.period, args.interval)
+    output = batch_fetch(fund_codes, args.period, args.interval, args.workers, args.processes)
 
     print("-" * 60)
     print(f"完成: 成功 {output['success_count']}/{output['total']}, 失败 {output['failed_count']}")
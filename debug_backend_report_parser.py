@@ -30,10 +30,11 @@ print("\n\n现在让我们检查为什么会返回这个内容...")
 print("\n让我们检查我们自己直接调用 extract_manager_viewpoint:")
 
 from fund_report_parser import extract_manager_viewpoint
-from backend.services.report_parser import _load_real_report_text
+from backend.services.report_parser import _download_valid_pdf, _extract_pdf_text_cached
 
-report_text = _load_real_report_text(fund_code, report_period)
-print(f"_load_real_report_text 返回长度: {len(report_text) if report_text else 0}")
+pdf_path, _ = _download_valid_pdf(fund_code, report_period)
+report_text = _extract_pdf_text_cached(pdf_path) if pdf_path else None
+print(f"PDF 文本长度: {len(report_text) if report_text else 0}")
 
 if report_text:
     print(f"\n现在调用我们修改后的 extract_manager_viewpoint:")
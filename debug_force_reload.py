@@ -20,7 +20,7 @@ print("重新导入模块...")
 
 from backend.services.report_parser import get_report_viewpoint
 from fund_report_parser import extract_manager_viewpoint
-from backend.services.report_parser import _load_real_report_text
+from backend.services.report_parser import _download_valid_pdf, _extract_pdf_text_cached
 
 fund_code = "008272"
 report_period = "2025Q4"
@@ -31,7 +31,8 @@ print(f"返回观点长度: {len(viewpoint) if viewpoint else 0}")
 print(f"观点内容: {repr(viewpoint)}")
 
 print("\n现在直接调用 extract_manager_viewpoint:")
-report_text = _load_real_report_text(fund_code, report_period)
+pdf_path, _ = _download_valid_pdf(fund_code, report_period)
+report_text = _extract_pdf_text_cached(pdf_path) if pdf_path else None
 vp = extract_manager_viewpoint(report_text)
 print(f"直接调用结果长度: {len(vp) if vp else 0}")
 print(f"直接调用内容: {repr(vp)}")
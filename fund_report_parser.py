@@ -7,8 +7,9 @@
 import re
 import json
 import requests
+from bisect import bisect_left
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 
 # 测试用基金列表
 TEST_FUNDS = [
@@ -67,6 +68,136 @@ def parse_pdf_content(pdf_text: str) -> Dict[str, Any]:
     return result
 
 
+# 观点章节标题关键字，五种标题格式都以它结尾
+_VIEWPOINT_KEYWORD = "投资策略和运作分析"
+
+# 章节终止标记（不含 4.x 小节编号），用零宽断言取得所有（可重叠的）起始位置
+_STOP_MARKER_RE = re.compile(
+    r"(?=§|第[五六七八]节|重要提示|投资组合报告|报告期内基金的业绩表现|基金的业绩表现"
+    r"|基金持有人数|基金资产净值预警|重大事项提示|财务指标)"
+)
+# 4.x 小节编号，点后允许空格
+_SECTION_NUMBER_RE = re.compile(r"(?=4\.\s*\d)")
+
+# 标题格式（按优先级），字段依次为：
+# 标题在关键字前的文字、关键字前的小节编号格式（None/"tight"/"loose"）、
+# 终止标记集合、正文最短/最长长度、正文是否不能包含 §
+_VIEWPOINT_HEADINGS = [
+    # 格式1: "4.X报告期内基金的投资策略和运作分析"（点后无空格）
+    ("报告期内基金的", "tight", "tight", 20, 8000, False),
+    # 格式2: "报告期内基金投资策略和运作分析"
+    ("报告期内基金", None, "base", 1, None, True),
+    # 格式3: "投资策略和运作分析"
+    ("", None, "base", 20, 8000, False),
+    # 格式4: "4.X投资策略和运作分析"（点后无空格）
+    ("", "tight", "tight", 20, 8000, False),
+    # 格式5: "4. X 报告期内基金的投资策略和运作分析"（点后有空格）
+    ("报告期内基金的", "loose", "loose", 20, 8000, False),
+]
+
+
+class _SectionIndex:
+    """一次扫描建立章节索引：观点标题关键字位置与各类终止标记位置"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.anchors = []
+        pos = text.find(_VIEWPOINT_KEYWORD)
+        while pos != -1:
+            self.anchors.append(pos)
+            pos = text.find(_VIEWPOINT_KEYWORD, pos + len(_VIEWPOINT_KEYWORD))
+
+        base = [m.start() for m in _STOP_MARKER_RE.finditer(text)]
+        loose = [m.start() for m in _SECTION_NUMBER_RE.finditer(text)]
+        tight = [q for q in loose if text[q + 2].isdecimal()]
+        self.stops = {
+            "base": base,
+            "tight": sorted(set(base).union(tight)),
+            "loose": sorted(set(base).union(loose)),
+        }
+
+    def find_bodies(self, heading) -> List[Tuple[int, int]]:
+        """返回某种标题格式下所有观点正文的 (起, 止) 位置，不重叠、按出现顺序"""
+        prefix, number, stop_key, min_len, max_len, no_section_sign = heading
+        text = self.text
+        bodies = []
+        last_end = 0
+        for anchor in self.anchors:
+            start = anchor - len(prefix)
+            if start < last_end or text[start:anchor] != prefix:
+                continue
+            if number:
+                start = _section_number_start(text, start, number == "loose")
+                if start is None or start < last_end:
+                    continue
+            body = self._match_body(
+                anchor + len(_VIEWPOINT_KEYWORD),
+                self.stops[stop_key],
+                min_len,
+                max_len,
+                no_section_sign,
+            )
+            if body:
+                bodies.append(body)
+                last_end = body[1]
+        return bodies
+
+    def _match_body(
+        self,
+        heading_end: int,
+        stops: List[int],
+        min_len: int,
+        max_len: Optional[int],
+        no_section_sign: bool,
+    ) -> Optional[Tuple[int, int]]:
+        text = self.text
+        # 标题后的空白与冒号可以归入正文，按从长到短的顺序尝试正文起点
+        for start in _body_starts(text, heading_end):
+            if no_section_sign and text[start : start + 1] == "§":
+                continue
+            i = bisect_left(stops, start + min_len)
+            if i == len(stops):
+                continue
+            # 正文止于终止标记前的空白处
+            end = max(start + min_len, _whitespace_start(text, stops[i]))
+            if max_len is not None and end - start > max_len:
+                continue
+            return start, end
+        return None
+
+
+def _body_starts(text: str, heading_end: int) -> range:
+    pos = heading_end
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    if pos < len(text) and text[pos] in "：:":
+        pos += 1
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+    return range(pos, heading_end - 1, -1)
+
+
+def _whitespace_start(text: str, pos: int) -> int:
+    while pos > 0 and text[pos - 1].isspace():
+        pos -= 1
+    return pos
+
+
+def _section_number_start(text: str, end: int, loose: bool) -> Optional[int]:
+    """紧邻 end 之前为 "4.X"（loose 时允许空白）时返回其起始位置"""
+    pos = _whitespace_start(text, end) if loose else end
+    digits_end = pos
+    while pos > 0 and text[pos - 1].isdecimal():
+        pos -= 1
+    if pos == digits_end:
+        return None
+    if loose:
+        pos = _whitespace_start(text, pos)
+    if pos >= 2 and text[pos - 2 : pos] == "4.":
+        return pos - 2
+    return None
+
+
 def extract_manager_viewpoint(text: str) -> Optional[str]:
     """
     提取基金经理观点章节
@@ -75,42 +206,17 @@ def extract_manager_viewpoint(text: str) -> Optional[str]:
     # 清理文本
     text = clean_text(text)
 
-    # 更智能的目录检测和跳过
-    # 我们找§4，但目录也有§4，我们需要找到真正的正文开始
-    # 策略：我们先找第一个"4.2"或"4.3"或"4.4"后面跟着一段很长文本的，那就是正文
-    
-    # 我们先尝试直接找，不跳过§4，让匹配模式更强大，并且让匹配更准确
-    # 然后，我们在匹配到结果后，验证内容是不是正文（不是只有几行或有点）
-    # 我们也可以尝试多种匹配方法，并且如果第一次匹配到的内容太短（比如<100字符），我们继续找
-    # 或者，我们找投资策略和运作分析的所有出现，然后选内容最长的一个！
-    
-    # 我们先直接尝试我们的匹配模式
-    # 不先处理文本，先让原文本完整
-
-    # 收集所有可能的候选观点
+    # 目录中也有同名标题，因此收集所有格式、所有位置的候选，最后选内容最长的一个
+    index = _SectionIndex(text)
     candidates = []
-    
-    # 多种匹配模式（按优先级）
-    patterns = [
-        # 模式1: 精确匹配"4.X报告期内基金投资策略和运作分析"（点后无空格）
-        r"4\.\d+报告期内基金的投资策略和运作分析\s*[：:]?\s*([\s\S]{20,8000}?)(?=\s*(?:4\.\d+|§|第[五六七八]节|第五节|重要提示|投资组合报告|报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警|重大事项提示|财务指标))",
-        # 模式2: 精确匹配"报告期内基金投资策略和运作分析"
-        r"报告期内基金投资策略和运作分析\s*[：:]?\s*\n?\s*([^§]+?)(?=\s*(?:§|第[五六七八]节|第五节|重要提示|投资组合报告|报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警|重大事项提示|财务指标))",
-        # 模式3: 匹配"投资策略和运作分析"长段落（降低长度要求从200降到20）
-        r"投资策略和运作分析\s*[：:]?\s*([\s\S]{20,8000}?)(?=\s*(?:§|第[五六七八]节|第五节|重要提示|投资组合报告|报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警|重大事项提示|财务指标))",
-        # 模式4: 匹配"4.X投资策略和运作分析"（点后无空格）
-        r"4\.\d+投资策略和运作分析\s*[：:]?\s*([\s\S]{20,8000}?)(?=\s*(?:4\.\d+|§|第[五六七八]节|第五节|重要提示|投资组合报告|报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警|重大事项提示|财务指标))",
-        # 模式5: 匹配"4\. X"格式（点后有空格）
-        r"4\.\s*\d+\s*报告期内基金的投资策略和运作分析\s*[：:]?\s*([\s\S]{20,8000}?)(?=\s*(?:4\.\s*\d+|§|第[五六七八]节|第五节|重要提示|投资组合报告|报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警|重大事项提示|财务指标))",
-    ]
-
-    # 尝试所有模式，收集所有候选
-    for pattern in patterns:
-        matches = list(re.finditer(pattern, text, re.DOTALL | re.IGNORECASE))
-        for match in matches:
-            viewpoint = match.group(1).strip()
-            # 进一步清洗
-            viewpoint = post_clean(viewpoint)
+    cleaned: Dict[Tuple[int, int], str] = {}
+    for heading in _VIEWPOINT_HEADINGS:
+        for body in index.find_bodies(heading):
+            # 不同标题格式常常命中同一段正文，清洗结果按位置复用
+            if body not in cleaned:
+                start, end = body
+                cleaned[body] = post_clean(text[start:end].strip())
+            viewpoint = cleaned[body]
             if validate_viewpoint(viewpoint):
                 candidates.append(viewpoint)
     
@@ -130,24 +236,58 @@ def extract_manager_viewpoint(text: str) -> Optional[str]:
     return None
 
 
+# 文本清洗使用的正则统一在模块加载时编译，批量解析时避免每次调用都查询 re 的缓存
+# clean_text: 页眉页脚与页码
+_PAGE_FOOTER_RE = re.compile(r"第\s*\d+\s*页\s*共\s*\d+\s*页")
+_PAGE_OF_RE = re.compile(r"Page\s*\d+\s*of\s*\d+", re.IGNORECASE)
+_PAGE_NUMBER_RE = re.compile(r"[\-–—]\s*\d+\s*[\-–—]")
+# clean_text: 段落分隔与连续空格
+_PARAGRAPH_BREAK_RE = re.compile(r"\n{2,}")
+_MULTI_SPACE_RE = re.compile(r" {2,}")
+
+# post_clean: 废话开头、表格残留、噪音、终止词与结尾残留编号
+_USELESS_PREFIXES = ("报告期内，", "本报告期内，", "本基金", "2024年")
+_TABLE_RESIDUE_RE = re.compile(r"\|\s*[^\|]+\s*\|")
+# 噪音模式之间会相互影响（删除后前后文本拼接可能形成新的匹配），须按顺序逐个替换
+_NOISE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in [
+        r"姓名\s+\w+\s+职务\s+基金经理",
+        r"4\.\d+\s*基金经理.*?简介",
+        r"4\.\d+\s*管理人对报告期内.*?说明",
+        r"投资策略和运作分析\s*[：:]?\s*\n?",
+        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年第[一二三四1234]季度报告",
+        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年中期报告",
+        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年度报告",
+    ]
+]
+_VIEWPOINT_STOP_RE = re.compile(
+    r"报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警"
+    r"|重大事项提示|财务指标|投资组合报告|财务会计报告"
+)
+_TRAILING_HEADING_RE = re.compile(r"(4\.\d+|第[一二三四五六七八]节)\s*$")
+# post_clean: 逐行过滤
+_PUNCTUATION_LINE_RE = re.compile(r"^[\d\s\.\-—]+$")
+_MANAGER_INFO_PREFIXES = ("姓名", "职务", "基金经理")
+_CJK_RUN_RE = re.compile(r"[\u4e00-\u9fff]{3,}")
+
+
 def clean_text(text: str) -> str:
     """文本预处理"""
     # 统一换行符
     text = text.replace("\r\n", "\n").replace("\r", "\n")
 
     # 去掉页眉页脚 (如 "第 X 页 共 Y 页")
-    text = re.sub(r"第\s*\d+\s*页\s*共\s*\d+\s*页", "", text)
-    text = re.sub(r"Page\s*\d+\s*of\s*\d+", "", text, flags=re.IGNORECASE)
+    text = _PAGE_FOOTER_RE.sub("", text)
+    text = _PAGE_OF_RE.sub("", text)
 
     # 去掉页码 (如 "- 3 -" 或 "—3—")
-    text = re.sub(r"[\-–—]\s*\d+\s*[\-–—]", "", text)
-
-    # 合并单行换行，保留段落换行
-    text = re.sub(r"(?<!\n)\n(?!\n)", " ", text)
-    text = re.sub(r" +", " ", text)
+    text = _PAGE_NUMBER_RE.sub("", text)
 
-    # 合并多个换行
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    # 一次完成：段内单个换行并为空格，两个及以上的连续换行统一为段落分隔
+    paragraphs = _PARAGRAPH_BREAK_RE.split(text)
+    text = "\n\n".join([paragraph.replace("\n", " ") for paragraph in paragraphs])
+    text = _MULTI_SPACE_RE.sub(" ", text)
 
     return text.strip()
 
@@ -155,38 +295,21 @@ def clean_text(text: str) -> str:
 def post_clean(text: str) -> str:
     """观点提取后清洗"""
     # 去掉常见的废话开头
-    useless_prefixes = [
-        "报告期内，",
-        "本报告期内，",
-        "本基金",
-        "2024年",
-    ]
-    for prefix in useless_prefixes:
+    for prefix in _USELESS_PREFIXES:
         if text.startswith(prefix):
             text = text[len(prefix) :].strip()
 
     # 去掉表格残留
-    text = re.sub(r"\|\s*[^\|]+\s*\|", "", text)
+    text = _TABLE_RESIDUE_RE.sub("", text)
 
     # 去掉基金经理简介等噪音
-    noise_patterns = [
-        r"姓名\s+\w+\s+职务\s+基金经理",
-        r"4\.\d+\s*基金经理.*?简介",
-        r"4\.\d+\s*管理人对报告期内.*?说明",
-        r"投资策略和运作分析\s*[：:]?\s*\n?",
-        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年第[一二三四1234]季度报告",
-        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年中期报告",
-        r"[\u4e00-\u9fffA-Za-z0-9（）()·\-]{6,}证券投资基金\d{4}年度报告",
-    ]
-    for pattern in noise_patterns:
-        text = re.sub(pattern, "", text, flags=re.IGNORECASE)
+    for pattern in _NOISE_PATTERNS:
+        text = pattern.sub("", text)
 
-    stop_pattern = (
-        r"(报告期内基金的业绩表现|基金的业绩表现|基金持有人数|基金资产净值预警"
-        r"|重大事项提示|财务指标|投资组合报告|财务会计报告)"
-    )
-    text = re.split(stop_pattern, text, maxsplit=1)[0]
-    text = re.sub(r"(4\.\d+|第[一二三四五六七八]节)\s*$", "", text).strip()
+    stop = _VIEWPOINT_STOP_RE.search(text)
+    if stop:
+        text = text[: stop.start()]
+    text = _TRAILING_HEADING_RE.sub("", text).strip()
 
     # 清理行
     lines = text.split("\n")
@@ -197,21 +320,17 @@ def post_clean(text: str) -> str:
         if len(line) < 3:
             continue
         # 过滤掉只有数字或标点的行
-        if re.match(r"^[\d\s\.\-—]+$", line):
+        if _PUNCTUATION_LINE_RE.match(line):
             continue
         # 过滤掉基金经理信息行
-        if re.match(r"^姓名|职务|基金经理", line):
+        if line.startswith(_MANAGER_INFO_PREFIXES):
             continue
         # 保留有实质内容的行
-        if len(line) > 10 or re.search(r"[\u4e00-\u9fff]{3,}", line):
+        if len(line) > 10 or _CJK_RUN_RE.search(line):
             cleaned_lines.append(line)
 
-    result = "\n".join(cleaned_lines).strip()
-
-    # 最终清理
-    result = re.sub(r"\n{3,}", "\n\n", result)
-
-    return result
+    # 各行均已去除首尾空白且非空，不会出现连续空行
+    return "\n".join(cleaned_lines).strip()
 
 
 def validate_viewpoint(text: str) -> bool: